@@ -1,10 +1,51 @@
+import base64
+import bisect
 import csv
+import hashlib
+import heapq
+import itertools
+import math
+import mimetypes
+import mmap
 import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from datetime import datetime
-from flask import Flask, render_template_string, request, redirect, url_for, session
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+from urllib.parse import urlsplit
+from flask import (Flask, abort, jsonify, make_response, render_template, request, redirect, send_file,
+                   stream_template, url_for, session)
+from jinja2 import DictLoader
+from markupsafe import Markup
+from werkzeug.http import parse_accept_header
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import safe_join
+from werkzeug.wsgi import ClosingIterator
+import click
 import webview
 import bcrypt
 
+try:
+    import fcntl
+except ImportError:  # Windows (version desktop, un seul processus)
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # optionnel : gzip seul
+    brotli = None
+
 app = Flask(__name__)
 # Génère une clé aléatoire ou utilise une variable d'environnement
 app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
@@ -13,6 +54,78 @@ app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
 USERS_FILE = './data/users.csv'
 PRODUCTS_FILE = './data/products.csv'
 ENTREPRISES_FILE = './data/entreprises.csv'
+# Journal append-only des modifications produits, replié dans PRODUCTS_FILE
+# par compactage au-delà de PRODUCTS_LOG_MAX_BYTES
+PRODUCTS_LOG_FILE = './data/products_log.csv'
+PRODUCTS_LOG_MAX_BYTES = int(os.environ.get('PRODUCTS_LOG_MAX_BYTES', 1024 * 1024))
+
+# Images produits extraites des data URIs, nommées par leur hash SHA-256
+IMAGES_DIR = './data/images'
+
+# Séquences d'ids (backend CSV), réservées par blocs de ID_BLOCK_SIZE par processus
+SEQUENCES_FILE = './data/sequences.csv'
+ID_BLOCK_SIZE = int(os.environ.get('ID_BLOCK_SIZE', 32))
+
+# Pool de processus bcrypt : au-delà de PASSWORD_POOL_MAX_PENDING opérations
+# en cours, /login et /register répondent 503 au lieu d'attendre
+PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', os.cpu_count() or 2))
+PASSWORD_POOL_MAX_PENDING = int(os.environ.get('PASSWORD_POOL_MAX_PENDING', 4 * PASSWORD_POOL_WORKERS))
+
+# Coût bcrypt calibré au démarrage pour qu'un hachage tienne dans
+# PASSWORD_HASH_BUDGET_MS ; les hashes d'un autre coût sont refaits au login
+PASSWORD_POLICY_FILE = './data/password_policy.csv'
+PASSWORD_HASH_BUDGET_MS = int(os.environ.get('PASSWORD_HASH_BUDGET_MS', 250))
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+
+# Filtre de Bloom des SHA-1 de mots de passe compromis, construit hors ligne
+# par `flask --app app build-pwned-filter <dump>` ; absent = vérification désactivée
+PWNED_FILTER_FILE = './data/pwned.bloom'
+
+# Limitation des tentatives de connexion (token buckets par IP et par compte)
+LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 10))
+LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', 10))
+LOGIN_ACCOUNT_BURST = int(os.environ.get('LOGIN_ACCOUNT_BURST', 5))
+LOGIN_ACCOUNT_PER_MINUTE = float(os.environ.get('LOGIN_ACCOUNT_PER_MINUTE', 2))
+LOGIN_THROTTLE_MAX_KEYS = int(os.environ.get('LOGIN_THROTTLE_MAX_KEYS', 100_000))
+# Nombre de reverse proxys de confiance devant l'application : leur
+# X-Forwarded-For donne l'IP du client (limitation par IP). 0 = connexion directe,
+# l'en-tête est ignoré (sinon n'importe quel client pourrait choisir son IP)
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+# Backend de stockage : 'csv' (historique) ou 'sqlite'
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'csv')
+SQLITE_FILE = os.environ.get('SQLITE_FILE', './data/marketplace.db')
+
+# Index de recherche en mémoire : au plus CATALOG_INDEX_MAX_ENTREPRISES
+# catalogues indexés par processus (les moins récemment utilisés sont libérés)
+CATALOG_INDEX_MAX_ENTREPRISES = int(os.environ.get('CATALOG_INDEX_MAX_ENTREPRISES', 256))
+# Classement BM25 : un mot du nom compte SEARCH_NAME_BOOST fois un mot de la description
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_NAME_BOOST = 3
+# Recherche approchée sur les noms (trigrammes), utilisée quand la recherche
+# exacte ne trouve rien : seuls les FUZZY_SEARCH_MAX_CANDIDATES produits
+# partageant le plus de trigrammes avec la requête sont comparés
+FUZZY_SEARCH_THRESHOLD = float(os.environ.get('FUZZY_SEARCH_THRESHOLD', 0.4))
+FUZZY_SEARCH_MAX_CANDIDATES = int(os.environ.get('FUZZY_SEARCH_MAX_CANDIDATES', 200))
+# Nombre de fiches produits HTML gardées en mémoire (cache LRU)
+PRODUCT_CARD_CACHE_SIZE = int(os.environ.get('PRODUCT_CARD_CACHE_SIZE', 10000))
+
+# Nombre de suggestions renvoyées par /products/suggest
+SUGGEST_LIMIT = 8
+
+# Compression des réponses textuelles (gzip, brotli si le module est installé)
+# à partir de COMPRESSION_MIN_SIZE octets
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+# Volume non compressé au-delà duquel une réponse en flux est vidée vers le client
+COMPRESSION_FLUSH_SIZE = 8192
+# Taille des morceaux envoyés par les pages rendues en flux
+STREAM_BUFFER_SIZE = 8192
+COMPRESSIBLE_TYPES = ('text/html', 'text/css', 'text/plain', 'text/javascript',
+                      'application/javascript', 'application/json', 'image/svg+xml')
 
 
 # ---------- Utils CSV / Auth ----------
@@ -39,12 +152,201 @@ def init_csv_files():
             writer.writerow(['id', 'nom', 'description', 'prix', 'quantite', 'id_entreprise', 'image_url'])
 
 
+def bcrypt_rounds(hashed):
+    """Coût d'un hash bcrypt ($2b$<coût>$...), 0 si le format est inconnu."""
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def calibrate_bcrypt_rounds(budget_ms):
+    """Plus grand coût bcrypt dont un hachage tient dans `budget_ms` sur cette machine.
+
+    Mesure un coût bas puis extrapole (chaque +1 double le temps de calcul).
+    """
+    probe_rounds = 8
+    start = time.perf_counter()
+    for _ in range(3):
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(probe_rounds))
+    probe_ms = (time.perf_counter() - start) / 3 * 1000
+    rounds = probe_rounds + int(math.log2(budget_ms / probe_ms))
+    return max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, rounds))
+
+
+class PasswordPolicy:
+    """Coût bcrypt en vigueur, calibré une fois puis persisté avec son budget.
+
+    La politique est partagée par tous les workers via PASSWORD_POLICY_FILE :
+    le premier qui démarre calibre, les autres relisent son résultat (sinon
+    deux workers calibrés différemment se re-hacheraient mutuellement les
+    mots de passe). Elle est recalibrée si PASSWORD_HASH_BUDGET_MS change.
+    """
+
+    def __init__(self, path, budget_ms):
+        self.path = path
+        self.budget_ms = budget_ms
+        self._lock = threading.Lock()
+        self._rounds = None
+
+    @property
+    def rounds(self):
+        with self._lock:
+            if self._rounds is None:
+                self._rounds = self._load()
+                if self._rounds is None:
+                    self._rounds = self._save(calibrate_bcrypt_rounds(self.budget_ms), overwrite=False)
+            return self._rounds
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if int(row['budget_ms']) == self.budget_ms:
+                    return int(row['rounds'])
+        return None
+
+    def _save(self, rounds, overwrite):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        try:
+            with open(self.path, 'w' if overwrite else 'x', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['budget_ms', 'rounds', 'calibrated_at'])
+                writer.writerow([self.budget_ms, rounds, datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
+        except FileExistsError:
+            # Un autre worker a calibré en même temps, ou l'ancien budget : on relit
+            existing = self._load()
+            if existing is not None:
+                return existing
+            return self._save(rounds, overwrite=True)
+        return rounds
+
+    def recalibrate(self):
+        with self._lock:
+            self._rounds = self._save(calibrate_bcrypt_rounds(self.budget_ms), overwrite=True)
+            return self._rounds
+
+    def needs_rehash(self, hashed):
+        return bcrypt_rounds(hashed) != self.rounds
+
+
+password_policy = PasswordPolicy(PASSWORD_POLICY_FILE, PASSWORD_HASH_BUDGET_MS)
+
+
+@app.cli.command('calibrate-bcrypt')
+def calibrate_bcrypt_command():
+    """Recalibre le coût bcrypt pour PASSWORD_HASH_BUDGET_MS (flask --app app calibrate-bcrypt)."""
+    rounds = password_policy.recalibrate()
+    print(f'Coût bcrypt : {rounds} (budget {PASSWORD_HASH_BUDGET_MS} ms) enregistré dans {PASSWORD_POLICY_FILE}')
+
+
+class PasswordPoolBusy(Exception):
+    """Levée quand la file du pool de hachage est pleine (ou le pool hors service)."""
+
+
+def _bcrypt_hash(password, rounds):
+    start = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+    return hashed, time.perf_counter() - start
+
+
+def _bcrypt_check(password, hashed):
+    start = time.perf_counter()
+    valid = bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    return valid, time.perf_counter() - start
+
+
+class PasswordHasherPool:
+    """Exécute bcrypt dans un pool de processus dédié, avec une file bornée.
+
+    Un hachage bcrypt coûte de l'ordre de la seconde : exécuté dans le thread
+    de la requête, une rafale de connexions bloque toutes les autres routes.
+    Ici au plus `max_pending` opérations sont en cours ou en attente ; au-delà,
+    `run` lève PasswordPoolBusy immédiatement au lieu de mettre la requête en
+    attente.
+
+    Si un worker meurt (OOM, kill), le pool est cassé pour toujours : il est
+    alors remplacé et l'opération relancée une fois.
+    """
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_time = 0.0
+        self._wait_time = 0.0
+        self._max_hash_time = 0.0
+        self._restarts = 0
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordPoolBusy()
+            self._pending += 1
+
+        start = time.perf_counter()
+        try:
+            result, hash_time = self._submit(fn, args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._completed += 1
+            self._hash_time += hash_time
+            self._wait_time += elapsed - hash_time
+            self._max_hash_time = max(self._max_hash_time, hash_time)
+        return result
+
+    def _submit(self, fn, args):
+        for _ in range(2):
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                executor = self._executor
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                with self._lock:
+                    # Un autre thread a pu remplacer le pool entre-temps
+                    if self._executor is executor:
+                        self._executor = None
+                        self._restarts += 1
+                executor.shutdown(wait=False)
+        raise PasswordPoolBusy()
+
+    def metrics(self):
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                'workers': self.workers,
+                'queue_depth': self._pending,
+                'max_pending': self.max_pending,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'restarts': self._restarts,
+                'avg_hash_ms': round(self._hash_time / completed * 1000, 1),
+                'max_hash_ms': round(self._max_hash_time * 1000, 1),
+                'avg_wait_ms': round(self._wait_time / completed * 1000, 1),
+            }
+
+
+password_pool = PasswordHasherPool(PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_PENDING)
+
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(14)).decode("utf-8")
+    return password_pool.run(_bcrypt_hash, password, password_policy.rounds)
 
 
 def check_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    return password_pool.run(_bcrypt_check, password, hashed)
 
 
 def get_next_id(filename):
@@ -56,72 +358,1332 @@ def get_next_id(filename):
         return max(ids) + 1 if ids else 1
 
 
-def get_user_by_email(email):
-    if not os.path.exists(USERS_FILE):
-        return None
-    with open(USERS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['email'] == email:
-                return row
-    return None
+# ---------- Verrous fichiers ----------
+
+class FileLock:
+    """flock sur un fichier verrou, partagé entre les workers.
+
+    À prendre sous le verrou de thread du propriétaire. Réentrant : les
+    niveaux imbriqués réutilisent le flock déjà tenu (un second flock sur un
+    autre descripteur bloquerait le processus lui-même). Sans fcntl
+    (Windows), seul le verrou de thread protège les fichiers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @contextmanager
+    def hold(self, exclusive=True, blocking=True):
+        """Donne True une fois le verrou pris ; False si `blocking` est faux et qu'il est déjà tenu."""
+        if fcntl is None or self._file is not None:
+            yield True
+            return
+        with open(self.path, 'a') as f:
+            mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(f, mode if blocking else mode | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            self._file = f
+            try:
+                yield True
+            finally:
+                self._file = None
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ---------- Séquences d'identifiants (CSV) ----------
+
+class IdAllocator:
+    """Séquences d'ids persistées par table, réservées par blocs (hi/lo).
+
+    Chaque processus réserve `block_size` ids d'un coup dans SEQUENCES_FILE
+    (sous verrou fichier), puis les distribue en mémoire : un insert coûte
+    O(1) et deux workers ne reçoivent jamais le même id. Les ids non
+    distribués d'un bloc sont perdus au redémarrage, ce qui laisse des trous
+    mais jamais de doublons.
+    """
+
+    def __init__(self, path, block_size=ID_BLOCK_SIZE):
+        self.path = path
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def next_id(self, table, seed):
+        """Retourne un nouvel id pour `table`.
+
+        `seed()` donne le premier id libre si la table n'a pas encore de
+        séquence (fichiers créés avant l'allocateur) ; il n'est appelé qu'une fois.
+        """
+        with self._lock:
+            block = self._blocks.get(table)
+            if block is None or block[0] >= block[1]:
+                start = self._reserve(table, seed)
+                block = self._blocks[table] = [start, start + self.block_size]
+            new_id = block[0]
+            block[0] += 1
+            return new_id
+
+    def _reserve(self, table, seed):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a+', newline='', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                sequences = {row['table']: int(row['next_id']) for row in csv.DictReader(f)}
+                start = sequences[table] if table in sequences else seed()
+                sequences[table] = start + self.block_size
+
+                f.seek(0)
+                f.truncate()
+                writer = csv.writer(f)
+                writer.writerow(['table', 'next_id'])
+                writer.writerows(sequences.items())
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return start
+
+
+id_allocator = IdAllocator(SEQUENCES_FILE)
+
+
+# ---------- Mots de passe compromis (filtre de Bloom hors ligne) ----------
+
+PWNED_FILTER_MAGIC = b'PWBLOOM1'
+# magic, nombre de bits m, nombre de hachages k, nombre d'entrées n
+PWNED_FILTER_HEADER = struct.Struct('<8sQIQ')
+PWNED_FILTER_OFFSET = 32
+
+
+def _bloom_positions(digest, m, k):
+    """Positions des k bits d'un SHA-1, par double hachage sur ses 16 premiers octets."""
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:16], 'little') | 1
+    return [(h1 + i * h2) % m for i in range(k)]
+
+
+def build_pwned_filter(dump_path, filter_path, fp_rate=0.001):
+    """Construit le filtre de Bloom à partir d'un dump SHA-1 (lignes `HASH[:COMPTE]`).
+
+    Le fichier est écrit via mmap : la mémoire utilisée ne dépend pas de la
+    taille du dump. Retourne (nombre d'entrées, taille du filtre en octets).
+    """
+    with open(dump_path, 'r', encoding='ascii', errors='ignore') as f:
+        n = sum(1 for line in f if line.strip())
+    n = max(n, 1)
+    m = max(8, int(-n * math.log(fp_rate) / math.log(2) ** 2))
+    m += -m % 8
+    k = max(1, round(m / n * math.log(2)))
+
+    tmp_path = filter_path + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(PWNED_FILTER_HEADER.pack(PWNED_FILTER_MAGIC, m, k, n).ljust(PWNED_FILTER_OFFSET, b'\0'))
+        out.truncate(PWNED_FILTER_OFFSET + m // 8)
+    with open(tmp_path, 'r+b') as out, mmap.mmap(out.fileno(), 0) as bits:
+        with open(dump_path, 'r', encoding='ascii', errors='ignore') as f:
+            for line in f:
+                try:
+                    digest = bytes.fromhex(line.split(':', 1)[0].strip())
+                except ValueError:
+                    continue
+                if len(digest) != 20:
+                    continue
+                for pos in _bloom_positions(digest, m, k):
+                    bits[PWNED_FILTER_OFFSET + (pos >> 3)] |= 1 << (pos & 7)
+        bits.flush()
+    os.replace(tmp_path, filter_path)
+    return n, PWNED_FILTER_OFFSET + m // 8
+
+
+class PwnedPasswordFilter:
+    """Lecture du filtre de Bloom via mmap : quelques accès mémoire par requête.
+
+    Sans fichier de filtre, la vérification est désactivée (aucun mot de
+    passe n'est considéré comme compromis).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._bits = None
+        self._loaded_stat = None
+
+    def _open(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return
+        stat = (st.st_mtime_ns, st.st_size)
+        if stat == self._loaded_stat:
+            return
+        with open(self.path, 'rb') as f:
+            bits = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, m, k, _ = PWNED_FILTER_HEADER.unpack_from(bits)
+        if magic != PWNED_FILTER_MAGIC:
+            bits.close()
+            raise ValueError(f'{self.path} n\'est pas un filtre de mots de passe compromis')
+        # Filtre reconstruit : l'ancien mapping garderait l'ancien fichier en mémoire
+        self._close()
+        self._bits, self._m, self._k = bits, m, k
+        self._loaded_stat = stat
+
+    def _close(self):
+        if self._bits is not None:
+            self._bits.close()
+        self._bits = None
+        self._loaded_stat = None
+
+    def __contains__(self, password):
+        with self._lock:
+            self._open()
+            if self._bits is None:
+                return False
+            digest = hashlib.sha1(password.encode('utf-8'), usedforsecurity=False).digest()
+            return all(
+                self._bits[PWNED_FILTER_OFFSET + (pos >> 3)] & (1 << (pos & 7))
+                for pos in _bloom_positions(digest, self._m, self._k)
+            )
+
+
+pwned_passwords = PwnedPasswordFilter(PWNED_FILTER_FILE)
+
+
+@app.cli.command('build-pwned-filter')
+@click.argument('dump_path')
+@click.option('--fp-rate', default=0.001, show_default=True, help='Taux de faux positifs visé.')
+def build_pwned_filter_command(dump_path, fp_rate):
+    """Construit PWNED_FILTER_FILE depuis un dump SHA-1 local (format Have I Been Pwned)."""
+    n, size = build_pwned_filter(dump_path, PWNED_FILTER_FILE, fp_rate)
+    print(f'{n} hash(es) indexé(s) dans {PWNED_FILTER_FILE} ({size / 1024 / 1024:.1f} Mo)')
+
+
+# ---------- Limitation des tentatives de connexion ----------
+
+class LoginThrottle:
+    """Token bucket par clé (IP ou compte) avec backoff exponentiel sur échec.
+
+    Chaque tentative consomme un jeton (`burst` au maximum, rechargés à
+    `per_minute` par minute). Au-delà de `free_failures` échecs consécutifs,
+    la clé est en plus bloquée 1 s, 2 s, 4 s... jusqu'à `max_backoff`.
+    Les clés sont gardées dans un OrderedDict borné à `max_keys` entrées :
+    la moins récemment vue est évincée.
+    """
+
+    def __init__(self, burst, per_minute, free_failures=3, max_backoff=900, max_keys=LOGIN_THROTTLE_MAX_KEYS):
+        self.burst = burst
+        self.refill_rate = per_minute / 60
+        self.free_failures = free_failures
+        self.max_backoff = max_backoff
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # clé -> [jetons, dernier accès, échecs consécutifs, bloquée jusqu'à]
+        self._entries = OrderedDict()
+
+    def _entry(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [self.burst, now, 0, 0.0]
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+            # Une clé restée inactive plus longtemps que le backoff maximal repart de zéro
+            if now - entry[1] > self.max_backoff:
+                entry[2] = 0
+            entry[0] = min(self.burst, entry[0] + (now - entry[1]) * self.refill_rate)
+            entry[1] = now
+        return entry
+
+    def acquire(self, key):
+        """Consomme un jeton ; retourne 0 si la tentative est permise, sinon le délai d'attente (s)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(key, now)
+            if entry[3] > now:
+                return entry[3] - now
+            if entry[0] < 1:
+                return (1 - entry[0]) / self.refill_rate
+            entry[0] -= 1
+            return 0
+
+    def failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(key, now)
+            entry[2] += 1
+            if entry[2] > self.free_failures:
+                entry[3] = now + min(2 ** (entry[2] - self.free_failures - 1), self.max_backoff)
+
+    def success(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[2] = 0
+                entry[3] = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+login_ip_throttle = LoginThrottle(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+login_account_throttle = LoginThrottle(LOGIN_ACCOUNT_BURST, LOGIN_ACCOUNT_PER_MINUTE)
+login_throttle_counters = {'rejected_ip': 0, 'rejected_account': 0, 'bcrypt_avoided': 0}
+_login_counters_lock = threading.Lock()
+
+
+def login_retry_after(ip, email):
+    """Délai imposé avant une nouvelle tentative (0 si permise), vérifié avant tout bcrypt."""
+    retry_after = login_ip_throttle.acquire(ip)
+    counter = 'rejected_ip'
+    if not retry_after:
+        retry_after = login_account_throttle.acquire(email)
+        counter = 'rejected_account'
+    if retry_after:
+        # Seuls les comptes existants auraient déclenché un checkpw ; lecture du
+        # stockage hors verrou
+        known = get_user_by_email(email) is not None
+        with _login_counters_lock:
+            login_throttle_counters[counter] += 1
+            if known:
+                login_throttle_counters['bcrypt_avoided'] += 1
+    return retry_after
+
+
+def login_throttle_metrics():
+    with _login_counters_lock:
+        metrics = dict(login_throttle_counters)
+    metrics['tracked_ips'] = len(login_ip_throttle)
+    metrics['tracked_accounts'] = len(login_account_throttle)
+    metrics['bcrypt_ms_avoided'] = round(metrics['bcrypt_avoided'] * password_pool.metrics()['avg_hash_ms'])
+    return metrics
+
+
+# ---------- Tables CSV indexées (users / entreprises) ----------
+
+USER_FIELDS = ['id', 'nom', 'email', 'mdp', 'role', 'created_at', 'id_entreprise']
+ENTREPRISE_FIELDS = ['id', 'nom', 'created_at']
+
+
+class IndexedCsvTable:
+    """Fichier CSV append-only chargé en mémoire avec des index par clé.
+
+    `keys` associe un nom d'index à la fonction qui calcule la clé d'une
+    ligne. Comme pour une lecture séquentielle, c'est la première ligne
+    rencontrée qui gagne en cas de doublon. Les index sont mis à jour à
+    chaque ajout et reconstruits si le fichier est modifié par un autre
+    processus. Les écritures relisent le fichier puis l'écrivent sous flock
+    exclusif : une inscription d'un autre worker n'est jamais écrasée.
+    """
+
+    def __init__(self, path, fields, keys):
+        self.path = path
+        self.fields = fields
+        self.keys = keys
+        self._lock = threading.RLock()
+        self._files = FileLock(path + '.lock')
+        self._rows = []
+        self._indexes = {}
+        self._stat = None
+        self._loaded = False
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _ensure_loaded(self):
+        if self._loaded and self._file_stat() == self._stat:
+            return
+        with self._files.hold(exclusive=False):
+            stat = self._file_stat()
+            self._rows = []
+            self._indexes = {name: {} for name in self.keys}
+            if stat is not None:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for row in csv.DictReader(f):
+                        self._index(row)
+            self._stat = stat
+            self._loaded = True
+
+    def _index(self, row):
+        self._rows.append(row)
+        for name, key in self.keys.items():
+            self._indexes[name].setdefault(key(row), row)
+
+    def get(self, index, value):
+        with self._lock:
+            self._ensure_loaded()
+            row = self._indexes[index].get(value)
+            return dict(row) if row else None
+
+    def all(self):
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(row) for row in self._rows]
+
+    def iter(self):
+        """Comme all(), mais copie les lignes une à une au fil de la lecture."""
+        with self._lock:
+            self._ensure_loaded()
+            # Instantané des références seulement : les copies se font hors verrou
+            rows = list(self._rows)
+        for row in rows:
+            yield dict(row)
+
+    def update(self, field, value, changes):
+        """Modifie la première ligne où `field == value` et réécrit le fichier (O(n))."""
+        with self._lock, self._files.hold():
+            self._ensure_loaded()
+            for i, row in enumerate(self._rows):
+                if row[field] == str(value):
+                    break
+            else:
+                return False
+            self._rows[i] = {**row, **{key: str(val) for key, val in changes.items()}}
+
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=self.fields)
+                writer.writeheader()
+                writer.writerows(self._rows)
+            os.replace(tmp_path, self.path)
+
+            rows, self._rows = self._rows, []
+            self._indexes = {name: {} for name in self.keys}
+            for row in rows:
+                self._index(row)
+            self._stat = self._file_stat()
+            return True
+
+    def append(self, row):
+        row = {field: str(row.get(field, '')) for field in self.fields}
+        with self._lock, self._files.hold():
+            self._ensure_loaded()
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                csv.DictWriter(f, fieldnames=self.fields).writerow(row)
+            self._index(row)
+            self._stat = self._file_stat()
+
+
+# ---------- Produits (CSV) ----------
+
+PRODUCT_FIELDS = ['id', 'nom', 'description', 'prix', 'quantite', 'id_entreprise', 'image_url']
+
+
+# Chiffres et au plus un point décimal : ni signe, ni exposant ('1E+2'), ni NaN / Infinity
+PRICE_RE = re.compile(r'\d+(?:\.\d*)?|\.\d+')
+CENT = Decimal('0.01')
+
+
+def parse_price(value):
+    """Montant saisi (prix d'un produit, filtre de prix), positif ou nul et
+    arrondi au centime ; ValueError sinon."""
+    text = str(value).strip()
+    if not PRICE_RE.fullmatch(text):
+        raise ValueError(f'Prix invalide : {value!r}')
+    try:
+        return Decimal(text).quantize(CENT, ROUND_HALF_UP)
+    except ArithmeticError:  # plus de chiffres que la précision du contexte
+        raise ValueError(f'Prix invalide : {value!r}')
+
+
+def parse_quantity(value):
+    """Quantité entière ; ValueError sinon."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Quantité invalide : {value!r}')
+
+
+class Product(NamedTuple):
+    """Produit du catalogue, converti une seule fois à la lecture du stockage.
+
+    prix est un Decimal et quantite un int ; les ids restent du texte, comme
+    dans les CSV (id_entreprise internée : une seule chaîne par entreprise).
+    Les templates gardent les mêmes noms (p.nom, p.prix...).
+    Un produit n'est jamais modifié : une mise à jour crée un nouvel objet.
+    NamedTuple plutôt qu'une classe à __slots__ : immuable d'office, pour
+    8 octets de plus par produit (104 contre 96).
+    revision n'est pas une colonne CSV : elle change à chaque écriture du
+    produit et sert de clé au cache des fiches (ProductCardCache).
+    """
+    id: str
+    nom: str
+    description: str
+    prix: Decimal
+    quantite: int
+    id_entreprise: str
+    image_url: str
+    revision: int = 0
+
+    @classmethod
+    def from_row(cls, row, revision=0):
+        """Produit d'une ligne CSV / SQLite ; un prix ou une quantité invalide
+        (saisi avant la validation des formulaires) compte pour 0. Le prix
+        stocké est relu tel quel, sans les règles de saisie de parse_price."""
+        try:
+            prix = Decimal(str(row['prix']))
+        except ArithmeticError:
+            prix = Decimal(0)
+        if not prix.is_finite():
+            prix = Decimal(0)
+        try:
+            quantite = parse_quantity(row['quantite'])
+        except ValueError:
+            quantite = 0
+        return cls(str(row['id']), row['nom'] or '', row['description'] or '', prix, quantite,
+                   sys.intern(str(row['id_entreprise'])), row['image_url'] or '', revision)
+
+    def as_row(self):
+        """Ligne CSV : toutes les valeurs en texte, sans la révision."""
+        return {field: str(value) for field, value in zip(PRODUCT_FIELDS, self)}
+
+
+def format_stats(nb_products, total_quantity, total_value):
+    return {
+        'nb_products': nb_products,
+        'total_quantity': total_quantity,
+        'total_value': float(total_value),
+    }
+
+
+class ProductStore:
+    """Catalogue produits chargé une seule fois en mémoire.
+
+    Sur disque, le catalogue est un snapshot (`products.csv`) complété par un
+    journal append-only (`products_log.csv`) : chaque ajout, modification ou
+    suppression y ajoute une ligne (upsert ou tombstone) au lieu de réécrire
+    tout le fichier. Au chargement, le journal est rejoué sur le snapshot ; quand
+    il dépasse `log_max_bytes`, un thread de fond le replie dans un nouveau
+    snapshot.
+
+    Entre processus, les fichiers sont protégés par un flock sur
+    `products.csv.lock` : exclusif pour un ajout (relecture + écriture dans le
+    journal) et pour les deux courtes étapes du compactage, partagé pour un
+    rechargement. Un second flock, `products.csv.compact.lock`, est tenu
+    pendant tout un compactage : un seul processus compacte à la fois.
+
+    Le cache est rechargé si un des fichiers a été modifié par un autre
+    processus. Les lectures passent par deux index :
+    - `_by_id` : id -> produit (O(1))
+    - `_by_entreprise` : id_entreprise -> {id -> produit} (O(k) pour k produits)
+
+    Les agrégats par entreprise (nombre de produits, quantité et valeur du
+    stock) sont tenus à jour à chaque ajout / retrait d'une ligne de l'index,
+    y compris pendant le rejeu : ils ne peuvent pas diverger des données.
+
+    La version des produits d'une entreprise est le couple (snapshot, nombre
+    d'enregistrements du journal qui la concernent) : deux processus qui ont
+    lu les mêmes fichiers voient la même version. La révision d'un produit
+    (Product.revision) n'a de sens que dans le processus : chaque produit lu
+    ou écrit en reçoit une nouvelle.
+    """
+
+    def __init__(self, path, log_path, ids, log_max_bytes=PRODUCTS_LOG_MAX_BYTES):
+        self.path = path
+        self.ids = ids
+        self.log_path = log_path
+        self.compacting_path = log_path + '.compacting'
+        self._files = FileLock(path + '.lock')
+        self._compactor = FileLock(path + '.compact.lock')
+        self._compacting = threading.Lock()
+        self.log_max_bytes = log_max_bytes
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_entreprise = {}
+        self._stats = {}
+        self._versions = {}
+        self._epoch = None
+        self._max_id = 0
+        self._stat = None
+        self._loaded = False
+        self._compaction = None
+        self._revisions = itertools.count(1)
+
+    def _file_stat(self):
+        stats = []
+        for path in (self.path, self.compacting_path, self.log_path):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                stats.append(None)
+            else:
+                stats.append((st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def _ensure_loaded(self):
+        """Recharge le cache si un fichier a changé depuis le dernier chargement."""
+        if self._loaded and self._file_stat() == self._stat:
+            return
+        # Sous verrou partagé : jamais un snapshot et un journal de deux états différents
+        with self._files.hold(exclusive=False):
+            stat = self._file_stat()
+            if not (self._loaded and stat == self._stat):
+                self._load(stat)
+
+    def _load(self, stat):
+        self._by_id = {}
+        self._by_entreprise = {}
+        self._stats = {}
+        self._versions = {}
+        self._epoch = stat[0]
+        self._max_id = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    if row['id']:
+                        self._index(Product.from_row(row, next(self._revisions)))
+        # Journal laissé par un compactage interrompu : il précède le journal courant
+        for path in (self.compacting_path, self.log_path):
+            if os.path.exists(path):
+                self._replay(path)
+        self._stat = stat
+        self._loaded = True
+
+    def _replay(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for record in csv.DictReader(f):
+                op = record.pop('op')
+                if op == 'upsert':
+                    # Ligne tronquée par un arrêt brutal : ignorée
+                    if None in record.values():
+                        continue
+                    row = Product.from_row(record, next(self._revisions))
+                    self._touch_upsert(self._by_id.get(row.id), row)
+                    self._index(row)
+                elif op == 'delete' and record['id'] in self._by_id:
+                    row = self._by_id[record['id']]
+                    self._touch(row.id_entreprise)
+                    self._unindex(row)
+
+    def _index(self, row):
+        old = self._by_id.get(row.id)
+        if old is not None:
+            self._count(old, -1)
+            if old.id_entreprise != row.id_entreprise:
+                self._by_entreprise.get(old.id_entreprise, {}).pop(row.id, None)
+        self._by_id[row.id] = row
+        self._by_entreprise.setdefault(row.id_entreprise, {})[row.id] = row
+        self._count(row, 1)
+        self._max_id = max(self._max_id, int(row.id))
+
+    def _unindex(self, row):
+        del self._by_id[row.id]
+        products = self._by_entreprise.get(row.id_entreprise, {})
+        products.pop(row.id, None)
+        if not products:
+            self._by_entreprise.pop(row.id_entreprise, None)
+        self._count(row, -1)
+
+    def _count(self, row, sign):
+        stats = self._stats.setdefault(row.id_entreprise, [0, 0, Decimal(0)])
+        stats[0] += sign
+        stats[1] += sign * row.quantite
+        stats[2] += sign * row.prix * row.quantite
+
+    def _touch(self, id_entreprise):
+        self._versions[id_entreprise] = self._versions.get(id_entreprise, 0) + 1
+
+    def _touch_upsert(self, old, row):
+        """Un upsert compte une fois par entreprise concernée, en direct comme au rejeu."""
+        if old is not None and old.id_entreprise != row.id_entreprise:
+            self._touch(old.id_entreprise)
+        self._touch(row.id_entreprise)
+
+    def _find(self, product_id, entreprise_id):
+        row = self._by_id.get(str(product_id))
+        if row is None or row.id_entreprise != str(entreprise_id):
+            return None
+        return row
+
+    def _append(self, op, row):
+        """Ajoute un enregistrement (dict de textes) au journal, puis compacte si besoin.
+
+        À appeler sous le verrou exclusif des fichiers, après `_ensure_loaded`.
+        """
+        is_new = not os.path.exists(self.log_path)
+        with open(self.log_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['op'] + PRODUCT_FIELDS)
+            if is_new:
+                writer.writeheader()
+            writer.writerow({'op': op, **row})
+            log_size = f.tell()
+        self._stat = self._file_stat()
+        if log_size > self.log_max_bytes and self._compaction is None:
+            self._compaction = threading.Thread(target=self.compact, daemon=True)
+            self._compaction.start()
+
+    def compact(self):
+        """Replie le journal dans un nouveau snapshot de `products.csv`.
+
+        Sous verrous, le journal est renommé en `.compacting` (les écritures
+        repartent dans un journal vide) et les produits, immuables, sont
+        copiés dans une liste. Le snapshot est ensuite écrit sans aucun verrou :
+        lectures et écritures continuent pendant ce temps. Les verrous ne sont
+        repris que pour substituer le snapshot et supprimer `.compacting`.
+        """
+        if not self._compacting.acquire(blocking=False):
+            return
+        try:
+            with self._compactor.hold(blocking=False) as acquired:
+                if acquired:
+                    self._compact()
+        finally:
+            self._compacting.release()
+            self._compaction = None
+
+    def _compact(self):
+        with self._lock, self._files.hold():
+            self._ensure_loaded()
+            if os.path.exists(self.compacting_path):
+                # Personne d'autre ne compacte : compactage abandonné, repris sous verrou
+                self._swap_snapshot(self._by_id.values(), dict(self._versions))
+                return
+            if not os.path.exists(self.log_path):
+                return
+            os.replace(self.log_path, self.compacting_path)
+            self._stat = self._file_stat()
+            products = list(self._by_id.values())
+            versions = dict(self._versions)
+
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        write_all_products(products, tmp_path)
+
+        with self._lock, self._files.hold():
+            # Le snapshot n'a pas changé depuis la rotation (un seul compacteur) :
+            # un rechargement entre-temps repart des mêmes compteurs
+            self._ensure_loaded()
+            self._swap_snapshot(None, versions, tmp_path)
+
+    def _swap_snapshot(self, products, versions, tmp_path=None):
+        """Substitue le snapshot et supprime le journal qu'il contient (verrous tenus).
+
+        Sans `tmp_path`, le snapshot de `products` est écrit ici et remplace
+        aussi le journal courant. `versions` sont les compteurs des
+        enregistrements repliés dans le snapshot : seuls ceux écrits après
+        restent comptés, comme pour un processus qui relirait les fichiers.
+        """
+        if tmp_path is None:
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            write_all_products(products, tmp_path)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+        os.replace(tmp_path, self.path)
+        os.remove(self.compacting_path)
+        self._stat = self._file_stat()
+        self._epoch = self._stat[0]
+        self._versions = {
+            id_entreprise: count - versions.get(id_entreprise, 0)
+            for id_entreprise, count in self._versions.items()
+            if count != versions.get(id_entreprise, 0)
+        }
+
+    # Les produits sont immuables : lectures sans copie
+
+    def all(self):
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._by_id.values())
+
+    def stats(self, id_entreprise):
+        with self._lock:
+            self._ensure_loaded()
+            return format_stats(*self._stats.get(str(id_entreprise), (0, 0, 0)))
+
+    def all_stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {id_entreprise: format_stats(*stats) for id_entreprise, stats in self._stats.items()}
+
+    def version(self, id_entreprise):
+        with self._lock:
+            self._ensure_loaded()
+            return (self._epoch, self._versions.get(str(id_entreprise), 0))
+
+    def by_entreprise(self, id_entreprise):
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._by_entreprise.get(str(id_entreprise), {}).values())
+
+    def get(self, product_id, entreprise_id):
+        with self._lock:
+            self._ensure_loaded()
+            return self._find(product_id, entreprise_id)
+
+    def add(self, row):
+        """Ajoute un produit et retourne son id."""
+        with self._lock, self._files.hold():
+            self._ensure_loaded()
+            product_id = self.ids.next_id('products', lambda: self._max_id + 1)
+            row = Product.from_row({**{field: row.get(field, '') for field in PRODUCT_FIELDS}, 'id': product_id},
+                                   next(self._revisions))
+            self._append('upsert', row.as_row())
+            self._touch(row.id_entreprise)
+            self._index(row)
+            return product_id
+
+    def update(self, product_id, entreprise_id, changes):
+        with self._lock, self._files.hold():
+            self._ensure_loaded()
+            row = self._find(product_id, entreprise_id)
+            if row is None:
+                return False
+            # Nouveau produit plutôt que mutation : les listes déjà retournées restent cohérentes
+            old, row = row, Product.from_row({**row.as_row(), **changes}, next(self._revisions))
+            self._append('upsert', row.as_row())
+            self._touch_upsert(old, row)
+            self._index(row)
+            return True
+
+    def delete(self, product_id, entreprise_id):
+        with self._lock, self._files.hold():
+            self._ensure_loaded()
+            row = self._find(product_id, entreprise_id)
+            if row is None:
+                return False
+            self._append('delete', {'id': row.id})
+            self._touch(row.id_entreprise)
+            self._unindex(row)
+            return True
+
+
+def write_all_products(products, path=PRODUCTS_FILE):
+    """Réécrit tout le fichier produits (snapshot écrit lors du compactage)."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=PRODUCT_FIELDS)
+        writer.writeheader()
+        for p in products:
+            writer.writerow(p.as_row())
+
+
+# ---------- Backends de stockage ----------
+
+class StorageBackend:
+    """Interface commune aux backends de stockage.
+
+    Les fonctions d'accès aux données (get_user_by_email, add_product, ...)
+    délèguent toutes au backend actif `storage`, choisi via STORAGE_BACKEND.
+    """
+
+    def init(self):
+        """Crée les fichiers / tables manquants."""
+        raise NotImplementedError
+
+    def get_user_by_email(self, email):
+        raise NotImplementedError
+
+    def create_user(self, nom, email, hashed_pwd, role, created_at, id_entreprise):
+        raise NotImplementedError
+
+    def update_user_password(self, user_id, hashed_pwd):
+        raise NotImplementedError
+
+    def get_entreprise_by_nom(self, nom):
+        raise NotImplementedError
+
+    def get_entreprise_by_id(self, entreprise_id):
+        raise NotImplementedError
+
+    def create_entreprise(self, nom, created_at):
+        raise NotImplementedError
+
+    def get_all_entreprises(self):
+        raise NotImplementedError
+
+    def iter_entreprises(self):
+        """Comme get_all_entreprises, mais ligne par ligne (pages rendues en flux)."""
+        raise NotImplementedError
+
+    def get_all_users(self):
+        raise NotImplementedError
+
+    def get_all_products(self):
+        raise NotImplementedError
+
+    def get_products_by_entreprise(self, id_entreprise):
+        raise NotImplementedError
+
+    def get_product_by_id(self, product_id, entreprise_id):
+        raise NotImplementedError
+
+    def get_entreprise_stats(self, id_entreprise):
+        """Agrégats maintenus : nb_products, total_quantity, total_value."""
+        raise NotImplementedError
+
+    def get_all_entreprise_stats(self):
+        """Agrégats de toutes les entreprises ayant des produits : {id (str) -> stats}."""
+        raise NotImplementedError
+
+    def get_products_version(self, id_entreprise):
+        """Version (epoch, compteur) des produits d'une entreprise.
+
+        Le compteur augmente de 1 à chaque ajout / modification / suppression
+        d'un de ses produits ; l'epoch change quand les compteurs repartent de zéro.
+        """
+        raise NotImplementedError
+
+    def add_product(self, product):
+        raise NotImplementedError
+
+    def update_product(self, product_id, entreprise_id, changes):
+        raise NotImplementedError
+
+    def delete_product(self, product_id, entreprise_id):
+        raise NotImplementedError
+
+
+class CsvBackend(StorageBackend):
+    """Stockage historique dans les fichiers CSV de ./data"""
+
+    def __init__(self):
+        self.ids = id_allocator
+        self.users = IndexedCsvTable(USERS_FILE, USER_FIELDS, {'email': lambda row: row['email']})
+        self.entreprises = IndexedCsvTable(ENTREPRISES_FILE, ENTREPRISE_FIELDS, {
+            'id': lambda row: row['id'],
+            'nom': lambda row: row['nom'].casefold(),
+        })
+        self.products = ProductStore(PRODUCTS_FILE, PRODUCTS_LOG_FILE, id_allocator)
+
+    def init(self):
+        init_csv_files()
+
+    def get_user_by_email(self, email):
+        return self.users.get('email', email)
+
+    def create_user(self, nom, email, hashed_pwd, role, created_at, id_entreprise):
+        user_id = self.ids.next_id('users', lambda: get_next_id(USERS_FILE))
+        self.users.append({
+            'id': user_id,
+            'nom': nom,
+            'email': email,
+            'mdp': hashed_pwd,
+            'role': role,
+            'created_at': created_at,
+            'id_entreprise': id_entreprise,
+        })
+        return user_id
+
+    def update_user_password(self, user_id, hashed_pwd):
+        return self.users.update('id', user_id, {'mdp': hashed_pwd})
+
+    def get_entreprise_by_nom(self, nom):
+        return self.entreprises.get('nom', nom.casefold())
+
+    def get_entreprise_by_id(self, entreprise_id):
+        return self.entreprises.get('id', str(entreprise_id))
+
+    def create_entreprise(self, nom, created_at):
+        entreprise_id = self.ids.next_id('entreprises', lambda: get_next_id(ENTREPRISES_FILE))
+        self.entreprises.append({'id': entreprise_id, 'nom': nom, 'created_at': created_at})
+        return entreprise_id
+
+    def get_all_entreprises(self):
+        return self.entreprises.all()
+
+    def iter_entreprises(self):
+        return self.entreprises.iter()
+
+    def get_all_users(self):
+        return self.users.all()
+
+    def get_all_products(self):
+        return self.products.all()
+
+    def get_products_by_entreprise(self, id_entreprise):
+        return self.products.by_entreprise(id_entreprise)
+
+    def get_product_by_id(self, product_id, entreprise_id):
+        return self.products.get(product_id, entreprise_id)
+
+    def get_entreprise_stats(self, id_entreprise):
+        return self.products.stats(id_entreprise)
+
+    def get_all_entreprise_stats(self):
+        return self.products.all_stats()
+
+    def get_products_version(self, id_entreprise):
+        return self.products.version(id_entreprise)
+
+    def add_product(self, product):
+        return self.products.add(product)
+
+    def update_product(self, product_id, entreprise_id, changes):
+        return self.products.update(product_id, entreprise_id, changes)
+
+    def delete_product(self, product_id, entreprise_id):
+        return self.products.delete(product_id, entreprise_id)
+
+
+SQLITE_SCHEMA = '''
+-- nom_key = nom.casefold(), calculé en Python : lower() de SQLite ne traite que l'ASCII
+CREATE TABLE IF NOT EXISTS entreprises (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    nom_key TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+);
+DROP INDEX IF EXISTS idx_entreprises_nom;
+CREATE INDEX IF NOT EXISTS idx_entreprises_nom_key ON entreprises (nom_key);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    email TEXT NOT NULL,
+    mdp TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'user',
+    created_at TEXT NOT NULL,
+    id_entreprise INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    prix TEXT NOT NULL,
+    quantite INTEGER NOT NULL,
+    id_entreprise INTEGER NOT NULL,
+    image_url TEXT NOT NULL DEFAULT '',
+    revision INTEGER NOT NULL DEFAULT 0 -- time.time_ns() de la dernière écriture
+);
+CREATE INDEX IF NOT EXISTS idx_products_entreprise ON products (id_entreprise);
+
+-- Agrégats par entreprise, maintenus par triggers dans la même transaction.
+-- La valeur du stock est en centimes entiers : une somme de REAL dériverait
+-- à chaque ajout / retrait (149.99999999999994 au lieu de 150).
+CREATE TABLE IF NOT EXISTS entreprise_stats (
+    id_entreprise INTEGER PRIMARY KEY,
+    nb_products INTEGER NOT NULL DEFAULT 0,
+    total_quantity INTEGER NOT NULL DEFAULT 0,
+    total_cents INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS products_stats_insert AFTER INSERT ON products BEGIN
+    INSERT OR IGNORE INTO entreprise_stats (id_entreprise) VALUES (NEW.id_entreprise);
+    UPDATE entreprise_stats
+    SET nb_products = nb_products + 1,
+        total_quantity = total_quantity + NEW.quantite,
+        total_cents = total_cents + CAST(round(NEW.prix * 100) AS INTEGER) * NEW.quantite
+    WHERE id_entreprise = NEW.id_entreprise;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_stats_delete AFTER DELETE ON products BEGIN
+    UPDATE entreprise_stats
+    SET nb_products = nb_products - 1,
+        total_quantity = total_quantity - OLD.quantite,
+        total_cents = total_cents - CAST(round(OLD.prix * 100) AS INTEGER) * OLD.quantite
+    WHERE id_entreprise = OLD.id_entreprise;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_stats_update AFTER UPDATE ON products BEGIN
+    UPDATE entreprise_stats
+    SET nb_products = nb_products - 1,
+        total_quantity = total_quantity - OLD.quantite,
+        total_cents = total_cents - CAST(round(OLD.prix * 100) AS INTEGER) * OLD.quantite
+    WHERE id_entreprise = OLD.id_entreprise;
+    INSERT OR IGNORE INTO entreprise_stats (id_entreprise) VALUES (NEW.id_entreprise);
+    UPDATE entreprise_stats
+    SET nb_products = nb_products + 1,
+        total_quantity = total_quantity + NEW.quantite,
+        total_cents = total_cents + CAST(round(NEW.prix * 100) AS INTEGER) * NEW.quantite
+    WHERE id_entreprise = NEW.id_entreprise;
+END;
+
+-- Version des produits de chaque entreprise (invalidation des index en mémoire)
+CREATE TRIGGER IF NOT EXISTS products_version_insert AFTER INSERT ON products BEGIN
+    INSERT OR IGNORE INTO entreprise_stats (id_entreprise) VALUES (NEW.id_entreprise);
+    UPDATE entreprise_stats SET version = version + 1 WHERE id_entreprise = NEW.id_entreprise;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_version_delete AFTER DELETE ON products BEGIN
+    UPDATE entreprise_stats SET version = version + 1 WHERE id_entreprise = OLD.id_entreprise;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_version_update AFTER UPDATE ON products BEGIN
+    INSERT OR IGNORE INTO entreprise_stats (id_entreprise) VALUES (NEW.id_entreprise);
+    UPDATE entreprise_stats SET version = version + 1
+    WHERE id_entreprise IN (OLD.id_entreprise, NEW.id_entreprise);
+END;
+'''
+
+# prix NUMERIC (bases plus anciennes) : '1.10' revenait en 1.1. La table est
+# reconstruite avec prix TEXT dans une seule transaction ; les anciennes
+# valeurs, déjà converties en nombres, sont écrites avec deux décimales.
+SQLITE_PRIX_TEXT_MIGRATION = f'''
+BEGIN;
+DROP TRIGGER IF EXISTS products_stats_insert;
+DROP TRIGGER IF EXISTS products_stats_delete;
+DROP TRIGGER IF EXISTS products_stats_update;
+DROP TRIGGER IF EXISTS products_version_insert;
+DROP TRIGGER IF EXISTS products_version_delete;
+DROP TRIGGER IF EXISTS products_version_update;
+ALTER TABLE products RENAME TO products_numeric;
+DROP INDEX IF EXISTS idx_products_entreprise;
+{SQLITE_SCHEMA}
+INSERT INTO products (id, nom, description, prix, quantite, id_entreprise, image_url)
+SELECT id, nom, description, printf('%.2f', prix), quantite, id_entreprise, image_url FROM products_numeric;
+DROP TABLE products_numeric;
+COMMIT;
+'''
+
+
+class SqliteBackend(StorageBackend):
+    """Stockage SQLite (mode WAL) avec une connexion par thread.
+
+    Le schéma est créé ou migré une seule fois par processus, à la première
+    connexion (quel que soit le serveur : python app.py, flask run, gunicorn),
+    sous flock pour que deux workers ne migrent pas la même base en même
+    temps. Les connexions des autres threads ne coûtent que les PRAGMA.
+    Les requêtes sont des chaînes constantes paramétrées : sqlite3 garde les
+    statements préparés en cache par connexion (`cached_statements`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not self._schema_ready:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            if not self._schema_ready:
+                with self._schema_lock:
+                    if not self._schema_ready:
+                        with FileLock(self.path + '.lock').hold():
+                            self._setup_schema(conn)
+                        self._schema_ready = True
+        return conn
+
+    def _columns(self, conn, table):
+        return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+    def init(self):
+        """Crée ou met à jour le schéma (fait aussi par la première connexion)."""
+        self._conn()
+
+    def _setup_schema(self, conn):
+        rebuild = False
+        # Bases créées avant les colonnes version / nom_key / total_cents / revision
+        columns = self._columns(conn, 'entreprise_stats')
+        if columns and 'version' not in columns:
+            conn.execute('ALTER TABLE entreprise_stats ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        if columns and 'total_cents' not in columns:
+            conn.execute('ALTER TABLE entreprise_stats ADD COLUMN total_cents INTEGER NOT NULL DEFAULT 0')
+            # Les triggers sur total_value sont recréés par SQLITE_SCHEMA
+            for trigger in ('insert', 'delete', 'update'):
+                conn.execute(f'DROP TRIGGER IF EXISTS products_stats_{trigger}')
+            rebuild = True
+        columns = self._columns(conn, 'entreprises')
+        if columns and 'nom_key' not in columns:
+            conn.execute("ALTER TABLE entreprises ADD COLUMN nom_key TEXT NOT NULL DEFAULT ''")
+            rows = conn.execute('SELECT id, nom FROM entreprises').fetchall()
+            with conn:
+                conn.executemany('UPDATE entreprises SET nom_key = ? WHERE id = ?',
+                                 [(row['nom'].casefold(), row['id']) for row in rows])
+        if any(row[1] == 'prix' and row[2] == 'NUMERIC' for row in conn.execute('PRAGMA table_info(products)')):
+            conn.executescript(SQLITE_PRIX_TEXT_MIGRATION)
+            # Prix affichés différemment : versions incrémentées par le recalcul
+            rebuild = True
+        columns = self._columns(conn, 'products')
+        if columns and 'revision' not in columns:
+            conn.execute('ALTER TABLE products ADD COLUMN revision INTEGER NOT NULL DEFAULT 0')
+        conn.executescript(SQLITE_SCHEMA)
+        # Base créée avant la table d'agrégats : calcul initial
+        if rebuild or (conn.execute('SELECT 1 FROM products LIMIT 1').fetchone()
+                       and not conn.execute('SELECT 1 FROM entreprise_stats LIMIT 1').fetchone()):
+            self.rebuild_stats()
+
+    def rebuild_stats(self):
+        """Recalcule entièrement entreprise_stats à partir de products.
+
+        Les versions ne repartent pas de zéro : elles sont incrémentées.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                'UPDATE entreprise_stats '
+                'SET nb_products = 0, total_quantity = 0, total_cents = 0, version = version + 1'
+            )
+            conn.execute(
+                'INSERT INTO entreprise_stats (id_entreprise, nb_products, total_quantity, total_cents, version) '
+                'SELECT id_entreprise, count(*), sum(quantite), sum(CAST(round(prix * 100) AS INTEGER) * quantite), 1 '
+                'FROM products WHERE true GROUP BY id_entreprise '
+                'ON CONFLICT (id_entreprise) DO UPDATE SET nb_products = excluded.nb_products, '
+                'total_quantity = excluded.total_quantity, total_cents = excluded.total_cents'
+            )
+
+    def _one(self, sql, params):
+        row = self._conn().execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def _all(self, sql, params=()):
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    def _iter(self, sql, params=()):
+        for row in self._conn().execute(sql, params):
+            yield dict(row)
+
+    def _products(self, sql, params=()):
+        return [Product.from_row(row, row['revision']) for row in self._conn().execute(sql, params)]
+
+    def _write(self, sql, params):
+        conn = self._conn()
+        with conn:
+            return conn.execute(sql, params)
+
+    def get_user_by_email(self, email):
+        return self._one('SELECT * FROM users WHERE email = ?', (email,))
+
+    def create_user(self, nom, email, hashed_pwd, role, created_at, id_entreprise):
+        return self._write(
+            'INSERT INTO users (nom, email, mdp, role, created_at, id_entreprise) VALUES (?, ?, ?, ?, ?, ?)',
+            (nom, email, hashed_pwd, role, created_at, id_entreprise)
+        ).lastrowid
+
+    def update_user_password(self, user_id, hashed_pwd):
+        return self._write('UPDATE users SET mdp = ? WHERE id = ?', (hashed_pwd, user_id)).rowcount > 0
+
+    def get_entreprise_by_nom(self, nom):
+        return self._one('SELECT id, nom, created_at FROM entreprises WHERE nom_key = ?', (nom.casefold(),))
+
+    def get_entreprise_by_id(self, entreprise_id):
+        return self._one('SELECT id, nom, created_at FROM entreprises WHERE id = ?', (entreprise_id,))
+
+    def create_entreprise(self, nom, created_at):
+        return self._write(
+            'INSERT INTO entreprises (nom, nom_key, created_at) VALUES (?, ?, ?)', (nom, nom.casefold(), created_at)
+        ).lastrowid
+
+    def get_all_entreprises(self):
+        return self._all('SELECT id, nom, created_at FROM entreprises ORDER BY id')
+
+    def iter_entreprises(self):
+        return self._iter('SELECT id, nom, created_at FROM entreprises ORDER BY id')
+
+    def get_all_users(self):
+        return self._all('SELECT * FROM users ORDER BY id')
+
+    def get_all_products(self):
+        return self._products('SELECT * FROM products ORDER BY id')
+
+    def get_products_by_entreprise(self, id_entreprise):
+        return self._products('SELECT * FROM products WHERE id_entreprise = ? ORDER BY id', (id_entreprise,))
+
+    def get_product_by_id(self, product_id, entreprise_id):
+        products = self._products('SELECT * FROM products WHERE id = ? AND id_entreprise = ?',
+                                  (product_id, entreprise_id))
+        return products[0] if products else None
+
+    def get_entreprise_stats(self, id_entreprise):
+        row = self._conn().execute(
+            'SELECT nb_products, total_quantity, total_cents FROM entreprise_stats WHERE id_entreprise = ?',
+            (id_entreprise,)
+        ).fetchone()
+        return self._stats(*(row or (0, 0, 0)))
+
+    def get_all_entreprise_stats(self):
+        rows = self._conn().execute(
+            'SELECT id_entreprise, nb_products, total_quantity, total_cents FROM entreprise_stats'
+        )
+        return {str(row[0]): self._stats(*row[1:]) for row in rows}
+
+    @staticmethod
+    def _stats(nb_products, total_quantity, total_cents):
+        return format_stats(nb_products, total_quantity, Decimal(total_cents).scaleb(-2))
+
+    def get_products_version(self, id_entreprise):
+        row = self._conn().execute(
+            'SELECT version FROM entreprise_stats WHERE id_entreprise = ?', (id_entreprise,)
+        ).fetchone()
+        return (0, row[0] if row else 0)
+
+    def add_product(self, product):
+        return self._write(
+            'INSERT INTO products (nom, description, prix, quantite, id_entreprise, image_url, revision) '
+            'VALUES (:nom, :description, :prix, :quantite, :id_entreprise, :image_url, :revision)',
+            {**product, 'revision': time.time_ns()}
+        ).lastrowid
+
+    def update_product(self, product_id, entreprise_id, changes):
+        cursor = self._write(
+            'UPDATE products SET nom = :nom, description = :description, prix = :prix, '
+            'quantite = :quantite, image_url = :image_url, revision = :revision '
+            'WHERE id = :id AND id_entreprise = :id_entreprise',
+            {**changes, 'id': product_id, 'id_entreprise': entreprise_id, 'revision': time.time_ns()}
+        )
+        return cursor.rowcount > 0
+
+    def delete_product(self, product_id, entreprise_id):
+        cursor = self._write('DELETE FROM products WHERE id = ? AND id_entreprise = ?', (product_id, entreprise_id))
+        return cursor.rowcount > 0
+
+
+def create_storage(name):
+    if name == 'csv':
+        return CsvBackend()
+    if name == 'sqlite':
+        return SqliteBackend(SQLITE_FILE)
+    raise ValueError(f'Backend de stockage inconnu : {name}')
+
+
+storage = create_storage(STORAGE_BACKEND)
 
 
 # ---------- Fonctions Entreprises ----------
 
 def get_entreprise_by_nom(nom):
     """Récupère une entreprise par son nom"""
-    if not os.path.exists(ENTREPRISES_FILE):
-        return None
-    with open(ENTREPRISES_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['nom'].lower() == nom.lower():
-                return row
-    return None
+    return storage.get_entreprise_by_nom(nom)
 
 
 def get_entreprise_by_id(entreprise_id):
     """Récupère une entreprise par son ID"""
-    if not os.path.exists(ENTREPRISES_FILE):
-        return None
-    with open(ENTREPRISES_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['id'] == str(entreprise_id):
-                return row
-    return None
+    return storage.get_entreprise_by_id(entreprise_id)
 
 
 def create_entreprise(nom):
     """Crée une nouvelle entreprise et retourne son ID"""
-    entreprise_id = get_next_id(ENTREPRISES_FILE)
     created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    with open(ENTREPRISES_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([entreprise_id, nom, created_at])
-    
-    return entreprise_id
+    return storage.create_entreprise(nom, created_at)
 
 
 def get_all_entreprises():
     """Récupère toutes les entreprises"""
-    entreprises = []
-    if not os.path.exists(ENTREPRISES_FILE):
-        return entreprises
-    with open(ENTREPRISES_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            entreprises.append(row)
-    return entreprises
+    return storage.get_all_entreprises()
+
+
+def iter_entreprises():
+    """Itère sur les entreprises sans les charger toutes en mémoire"""
+    return storage.iter_entreprises()
 
 
 # ---------- Utilisateurs ----------
 
+def get_user_by_email(email):
+    return storage.get_user_by_email(email)
+
+
 def create_user(nom, email, password, nom_entreprise):
     """Crée un utilisateur et l'associe à une entreprise"""
-    user_id = get_next_id(USERS_FILE)
     hashed_pwd = hash_password(password)
     created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
@@ -133,99 +1695,743 @@ def create_user(nom, email, password, nom_entreprise):
     else:
         id_entreprise = create_entreprise(nom_entreprise)
     
-    with open(USERS_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([user_id, nom, email, hashed_pwd, 'user', created_at, id_entreprise])
-    
-    return user_id
+    return storage.create_user(nom, email, hashed_pwd, 'user', created_at, id_entreprise)
 
 
-# ---------- Produits (CSV) ----------
+# ---------- Images (stockage par contenu) ----------
+
+IMAGE_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'image/avif': 'avif',
+}
+DATA_URI_RE = re.compile(r'data:(?P<mime>[\w/+.-]+);base64,(?P<data>.*)', re.DOTALL)
+IMAGE_NAME_RE = re.compile(r'(?P<hash>[0-9a-f]{64})\.(?P<ext>[a-z]+)')
+
+
+def image_blob_path(name):
+    """Chemin d'un blob : les fichiers sont répartis par les 2 premiers caractères du hash."""
+    return os.path.join(IMAGES_DIR, name[:2], name)
+
+
+def externalize_image(image_url):
+    """Remplace une image `data:` par une référence `/images/<sha256>.<ext>`.
+
+    Les octets décodés sont écrits une seule fois dans IMAGES_DIR (le nom est
+    le hash du contenu). Les URLs classiques, ou les data URIs d'un type non
+    supporté / mal encodées, sont retournées telles quelles.
+    """
+    match = DATA_URI_RE.fullmatch(image_url.strip())
+    if not match or match['mime'] not in IMAGE_EXTENSIONS:
+        return image_url
+    try:
+        data = base64.b64decode(match['data'], validate=True)
+    except ValueError:
+        return image_url
+
+    name = f"{hashlib.sha256(data).hexdigest()}.{IMAGE_EXTENSIONS[match['mime']]}"
+    path = image_blob_path(name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return f'/images/{name}'
+
+
+def parse_image_url(value):
+    """URL d'image d'un produit : vide, http(s), data: ou `/images/<sha256>.<ext>` ; ValueError sinon.
+
+    Le champ du formulaire est un simple texte (une URL relative comme
+    `/images/...` ne passe pas la validation `type="url"` du navigateur) :
+    c'est ici que l'URL est vérifiée.
+    """
+    value = value.strip()
+    if not value or value.startswith('data:'):
+        return value
+    if value.startswith('/images/') and IMAGE_NAME_RE.fullmatch(value[len('/images/'):]):
+        return value
+    parts = urlsplit(value)
+    if parts.scheme in ('http', 'https') and parts.netloc:
+        return value
+    raise ValueError(f"URL d'image invalide : {value!r}")
+
+
+@app.cli.command('externalize-images')
+def externalize_images_command():
+    """Sort les images `data:` déjà présentes dans le catalogue vers IMAGES_DIR."""
+    count = 0
+    for p in storage.get_all_products():
+        if p.image_url.startswith('data:'):
+            image_url = externalize_image(p.image_url)
+            if image_url != p.image_url:
+                storage.update_product(p.id, p.id_entreprise, {
+                    'nom': p.nom,
+                    'description': p.description,
+                    'prix': str(p.prix),
+                    'quantite': str(p.quantite),
+                    'image_url': image_url,
+                })
+                count += 1
+    print(f'{count} image(s) extraite(s) vers {IMAGES_DIR}')
+
+
+def update_user_password(user_id, hashed_pwd):
+    return storage.update_user_password(user_id, hashed_pwd)
+
+
+# ---------- Index de recherche produits ----------
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    """Minuscules sans accents : « Écran » et « ecran » donnent le même texte."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize_text(text))
+
+
+def trigrams(word):
+    """Trigrammes d'un mot, bordé comme dans pg_trgm : « tel » -> {'  t', ' te', 'tel', 'el '}."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Clés des index secondaires triés de CatalogIndex (tri et filtres par intervalle)
+PRODUCT_SORT_KEYS = {
+    'id': lambda product: int(product.id),
+    'nom': lambda product: normalize_text(product.nom),
+    'prix': lambda product: product.prix,
+    'quantite': lambda product: product.quantite,
+}
+
+
+def trigram_similarity(query_words, name_words):
+    """Moyenne, sur les mots de la requête, de leur meilleure similarité
+    (Jaccard des trigrammes) avec un mot du nom."""
+    if not name_words:
+        return 0
+    total = 0
+    for query in query_words:
+        total += max(len(query & word) / len(query | word) for word in name_words)
+    return total / len(query_words)
+
+
+def _active_ranges(ranges):
+    """Filtres par intervalle ayant au moins une borne."""
+    return {key: bounds for key, bounds in (ranges or {}).items() if bounds != (None, None)}
+
+
+class CatalogIndex:
+    """Index inversé des produits d'une entreprise, avec classement BM25.
+
+    - `_postings` : token normalisé -> {id produit -> fréquence pondérée},
+      un token du nom comptant SEARCH_NAME_BOOST fois
+    - `_vocabulary` : tokens triés, pour retrouver par bisect tous les tokens
+      commençant par un préfixe
+    - `_lengths` : longueur pondérée de chaque produit (normalisation BM25)
+    - `_trigrams` : trigramme -> ids des produits dont le nom le contient
+      (recherche tolérante aux fautes de frappe)
+    - `_names` : (nom normalisé à partir de chacun de ses mots, id) triés,
+      pour l'autocomplétion par bisect
+    - `_orders` : pour chaque clé de PRODUCT_SORT_KEYS, les (valeur, id, id)
+      triés : tri et filtres par intervalle en O(log n) par bisect
+
+    Une recherche ne parcourt que les listes des tokens concernés, pas le catalogue.
+    """
+
+    def __init__(self, version, products):
+        self.version = version
+        self.products = {}
+        self._postings = {}
+        self._vocabulary = []
+        self._lengths = {}
+        self._total_length = 0
+        self._trigrams = {}
+        self._names = []
+        self._orders = {key: [] for key in PRODUCT_SORT_KEYS}
+        self._values = {}
+        self._totals = {}
+        # Construction : listes triées une seule fois à la fin plutôt qu'insertion par bisect
+        for product in products:
+            self._add(product, list.append)
+        for sorted_list in (self._vocabulary, self._names, *self._orders.values()):
+            sorted_list.sort()
+
+    @staticmethod
+    def _frequencies(product):
+        frequencies = {}
+        for token in tokenize(product.nom):
+            frequencies[token] = frequencies.get(token, 0) + SEARCH_NAME_BOOST
+        for token in tokenize(product.description):
+            frequencies[token] = frequencies.get(token, 0) + 1
+        return frequencies
+
+    def add(self, product):
+        """Ajoute ou remplace un produit."""
+        self.remove(product.id)
+        self._add(product, bisect.insort)
+
+    def _add(self, product, insert):
+        """Indexe un produit ; `insert(liste, élément)` alimente les listes triées."""
+        product_id = product.id
+        self.products[product_id] = product
+        self._totals.clear()
+        frequencies = self._frequencies(product)
+        for token, frequency in frequencies.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insert(self._vocabulary, token)
+            postings[product_id] = frequency
+        self._lengths[product_id] = sum(frequencies.values())
+        self._total_length += self._lengths[product_id]
+        for trigram in self._name_trigrams(product):
+            self._trigrams.setdefault(trigram, set()).add(product_id)
+        for name in self._name_suffixes(product):
+            insert(self._names, (name, product_id))
+        values = self._values[product_id] = {key: value(product) for key, value in PRODUCT_SORT_KEYS.items()}
+        for key, value in values.items():
+            insert(self._orders[key], (value, int(product_id), product_id))
+
+    @staticmethod
+    def _name_trigrams(product):
+        return set().union(*(trigrams(word) for word in tokenize(product.nom)))
+
+    @staticmethod
+    def _name_suffixes(product):
+        """« Téléphone portable » -> 'telephone portable', 'portable'."""
+        words = tokenize(product.nom)
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def remove(self, product_id):
+        product_id = str(product_id)
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return
+        self._totals.clear()
+        for token in self._frequencies(product):
+            postings = self._postings[token]
+            del postings[product_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+        self._total_length -= self._lengths.pop(product_id)
+        for trigram in self._name_trigrams(product):
+            ids = self._trigrams[trigram]
+            ids.discard(product_id)
+            if not ids:
+                del self._trigrams[trigram]
+        for name in self._name_suffixes(product):
+            del self._names[bisect.bisect_left(self._names, (name, product_id))]
+        for key, value in self._values.pop(product_id).items():
+            order = self._orders[key]
+            del order[bisect.bisect_left(order, (value, int(product_id), product_id))]
+
+    def _expand(self, prefix):
+        """Tokens du vocabulaire commençant par `prefix` (« ecr » -> « ecran », « ecrou »)."""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\U0010ffff', start)
+        return self._vocabulary[start:end]
+
+    def _match(self, query):
+        """Postings de chaque mot de `query` et produits contenant tous les mots."""
+        terms = []
+        for word in set(tokenize(query)):
+            postings = [self._postings[token] for token in self._expand(word)]
+            if not postings:
+                return [], set()
+            terms.append(postings)
+        if not terms:
+            return [], set()
+
+        # Intersection des ids d'abord (opérations d'ensembles, en partant du
+        # mot le plus sélectif) : seuls les produits retenus sont notés
+        terms.sort(key=lambda postings: sum(map(len, postings)))
+        matches = set().union(*terms[0])
+        for postings in terms[1:]:
+            matches = set().union(*(matches.intersection(ids) for ids in postings))
+            if not matches:
+                break
+        return terms, matches
+
+    def _scores(self, terms, matches):
+        """Score BM25 de chaque produit de `matches`."""
+        n = len(self.products)
+        average_length = self._total_length / n
+        scores = dict.fromkeys(matches, 0)
+        for postings in terms:
+            # Plusieurs tokens pour un même préfixe : le meilleur compte
+            best = {}
+            for ids in postings:
+                idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                for product_id in matches.intersection(ids):
+                    frequency = ids[product_id]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[product_id] / average_length)
+                    score = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    if score > best.get(product_id, 0):
+                        best[product_id] = score
+            for product_id, score in best.items():
+                scores[product_id] += score
+        return scores
+
+    def _in_ranges(self, product_id, ranges):
+        values = self._values[product_id]
+        return all((low is None or values[key] >= low) and (high is None or values[key] <= high)
+                   for key, (low, high) in ranges.items())
+
+    def _sort_key(self, sort):
+        return lambda product_id: (self._values[product_id][sort], int(product_id))
+
+    def _cursor(self, sort, after):
+        """Position (valeur, id) du produit `after` dans l'ordre `sort`, None s'il n'existe plus."""
+        values = self._values.get(str(after))
+        if after is None or values is None:
+            return None
+        return values[sort], int(after), str(after)
+
+    def _first(self, ids, sort, offset, limit, cursor):
+        """Les produits de `ids` qui suivent `cursor`, tranche [offset, offset + limit) selon `sort`."""
+        key = self._sort_key(sort)
+        if cursor is not None:
+            ids = [product_id for product_id in ids if key(product_id) > cursor[:2]]
+        end = None if limit is None else offset + limit
+        # Le tas ne vaut que pour une petite part des produits (pages proches du début)
+        if end is None or end > len(ids) // 4:
+            return sorted(ids, key=key)[offset:end]
+        return heapq.nsmallest(end, ids, key=key)[offset:]
+
+    def search(self, query, offset=0, limit=None, sort=None, ranges=None, after=None):
+        """Produits contenant chaque mot de `query` (en préfixe), filtrés par
+        `ranges` (voir `listing`), par pertinence ou selon la clé `sort`.
+
+        Retourne (nombre total de résultats, produits de la tranche demandée) ;
+        seuls les offset + limit premiers sont triés (tas), et seule la
+        tranche est matérialisée. `after` : voir `listing`.
+        """
+        terms, matches = self._match(query)
+        ranges = _active_ranges(ranges)
+        if ranges:
+            matches = {product_id for product_id in matches if self._in_ranges(product_id, ranges)}
+        if not matches:
+            return 0, []
+        if after is not None and str(after) in matches:
+            offset = 0
+        else:
+            after = None
+        if sort:
+            page = self._first(matches, sort, offset, limit, self._cursor(sort, after))
+            return len(matches), [self.products[product_id] for product_id in page]
+
+        scores = self._scores(terms, matches)
+        ranking = ((score, -int(product_id), product_id) for product_id, score in scores.items())
+        if after is not None:
+            cursor = (scores[str(after)], -int(after), str(after))
+            ranking = (entry for entry in ranking if entry < cursor)
+        if limit is None:
+            top = sorted(ranking, reverse=True)
+        else:
+            top = heapq.nlargest(offset + limit, ranking)
+        return len(matches), [self.products[product_id] for _, _, product_id in top[offset:]]
+
+    def _bounds(self, key, low, high):
+        """Positions [début, fin) des entrées de l'index `key` entre low et high inclus."""
+        order = self._orders[key]
+        start = 0 if low is None else bisect.bisect_left(order, (low,))
+        end = len(order) if high is None else bisect.bisect_left(order, (high, math.inf))
+        return start, max(start, end)
+
+    def listing(self, sort='id', ranges=None, offset=0, limit=None, after=None):
+        """Produits triés selon `sort` (clé de PRODUCT_SORT_KEYS) et filtrés par
+        `ranges` : {clé: (min, max)}, bornes incluses, None pour une borne ouverte.
+
+        L'index secondaire le plus sélectif est délimité par bisect. Quand il
+        donne aussi l'ordre, la lecture s'arrête dès la page remplie ; `after`
+        (id du dernier produit de la page précédente) y reprend directement
+        après lui au lieu de sauter `offset` produits : une page profonde coûte
+        O(log n + page) comme la première. Les totaux filtrés sont mis en cache
+        jusqu'à la prochaine écriture.
+        Retourne (nombre total, produits de la tranche).
+        """
+        ranges = _active_ranges(ranges)
+        cursor = self._cursor(sort, after)
+        if cursor is not None:
+            offset = 0
+        bounds = {key: self._bounds(key, low, high) for key, (low, high) in ranges.items()}
+        bounds.setdefault(sort, (0, len(self._orders[sort])))
+        sizes = {key: stop - start for key, (start, stop) in bounds.items()}
+        selective = min(bounds, key=sizes.get)
+        # Filtre peu sélectif : parcourir l'index de tri jusqu'à remplir la page
+        # (~ (offset + limit) * n_tri / m lectures) coûte moins que trier les m
+        # produits retenus par l'index le plus sélectif
+        driver = selective
+        if limit is not None and (offset + limit) * sizes[sort] < sizes[selective] ** 2:
+            driver = sort
+        start, stop = bounds[driver]
+        others = {key: limits for key, limits in ranges.items() if key != driver}
+
+        if driver != sort:
+            ids = [product_id for _, _, product_id in self._orders[driver][start:stop]
+                   if self._in_ranges(product_id, others)]
+            page = self._first(ids, sort, offset, limit, cursor)
+            return len(ids), [self.products[product_id] for product_id in page]
+
+        order = self._orders[sort]
+        total = stop - start
+        if cursor is not None:
+            start = max(start, bisect.bisect_right(order, cursor, start, stop))
+        if not others:
+            end = stop if limit is None else min(stop, start + offset + limit)
+            return total, [self.products[product_id] for _, _, product_id in order[start + offset:end]]
+
+        page = []
+        for i in range(start, stop):
+            product_id = order[i][2]
+            if not self._in_ranges(product_id, others):
+                continue
+            if offset:
+                offset -= 1
+                continue
+            page.append(self.products[product_id])
+            if len(page) == limit:
+                break
+        others = {key: limits for key, limits in ranges.items() if key != selective}
+        return self._count(selective, bounds[selective], others), page
+
+    def _count(self, driver, bounds, others):
+        """Nombre de produits de l'intervalle `bounds` de l'index `driver` passant les autres filtres."""
+        key = (driver, bounds, tuple(sorted(others.items())))
+        if key not in self._totals:
+            start, stop = bounds
+            self._totals[key] = sum(1 for _, _, product_id in self._orders[driver][start:stop]
+                                    if self._in_ranges(product_id, others))
+        return self._totals[key]
+
+    def suggest(self, prefix, limit=SUGGEST_LIMIT):
+        """Au plus `limit` produits dont le nom, ou un mot du nom, commence par `prefix`."""
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+        suggestions = {}
+        i = bisect.bisect_left(self._names, (prefix,))
+        while i < len(self._names) and len(suggestions) < limit:
+            name, product_id = self._names[i]
+            if not name.startswith(prefix):
+                break
+            suggestions.setdefault(product_id, self.products[product_id])
+            i += 1
+        return list(suggestions.values())
+
+    def fuzzy_search(self, query, offset=0, limit=None, ranges=None, after=None,
+                     threshold=FUZZY_SEARCH_THRESHOLD, max_candidates=FUZZY_SEARCH_MAX_CANDIDATES):
+        """Produits dont le nom ressemble à `query` (« telefone » -> « Téléphone »).
+
+        Les produits sont d'abord comptés par trigrammes partagés avec la
+        requête (listes de l'index uniquement) ; seuls les `max_candidates`
+        meilleurs sont comparés mot à mot et gardés au-dessus de `threshold`.
+        Retourne (nombre de résultats, produits de la tranche demandée) ;
+        `after` : voir `listing`.
+        """
+        query_words = [trigrams(word) for word in tokenize(query)]
+        if not query_words:
+            return 0, []
+        shared = Counter(itertools.chain.from_iterable(
+            self._trigrams.get(trigram, ()) for trigram in set().union(*query_words)
+        ))
+        ranges = _active_ranges(ranges)
+        if ranges:
+            shared = {product_id: count for product_id, count in shared.items()
+                      if self._in_ranges(product_id, ranges)}
+        results = []
+        for product_id in heapq.nlargest(max_candidates, shared, key=shared.get):
+            name_words = [trigrams(word) for word in tokenize(self.products[product_id].nom)]
+            similarity = trigram_similarity(query_words, name_words)
+            if similarity >= threshold:
+                results.append((similarity, -int(product_id), product_id))
+        results.sort(reverse=True)
+        # Au plus max_candidates résultats : le curseur est cherché dans la liste
+        for i, (_, _, product_id) in enumerate(results):
+            if product_id == str(after):
+                offset = i + 1
+                break
+        end = None if limit is None else offset + limit
+        return len(results), [self.products[product_id] for _, _, product_id in results[offset:end]]
+
+
+class CatalogIndexes:
+    """Index des catalogues, construits à la demande et tenus à jour par les écritures.
+
+    Chaque index porte la version des produits de son entreprise au moment où
+    il reflète les données. Une écriture locale qui fait avancer la version
+    d'exactement un cran est appliquée à l'index ; sinon (écriture d'un autre
+    processus, compactage...) l'index est reconstruit à la prochaine lecture.
+    """
+
+    def __init__(self, max_entreprises=CATALOG_INDEX_MAX_ENTREPRISES):
+        self.max_entreprises = max_entreprises
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, id_entreprise):
+        """Index à jour de l'entreprise ; à appeler sous verrou."""
+        key = str(id_entreprise)
+        version = storage.get_products_version(id_entreprise)
+        index = self._indexes.get(key)
+        if index is None or index.version != version:
+            index = CatalogIndex(version, storage.get_products_by_entreprise(id_entreprise))
+            self._indexes[key] = index
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_entreprises:
+            self._indexes.popitem(last=False)
+        return index
+
+    def search(self, id_entreprise, query, offset=0, limit=None, sort=None, ranges=None, after=None):
+        with self._lock:
+            return self._get(id_entreprise).search(query, offset, limit, sort, ranges, after)
+
+    def fuzzy_search(self, id_entreprise, query, offset=0, limit=None, ranges=None, after=None):
+        with self._lock:
+            return self._get(id_entreprise).fuzzy_search(query, offset, limit, ranges, after)
+
+    def listing(self, id_entreprise, sort='id', ranges=None, offset=0, limit=None, after=None):
+        with self._lock:
+            return self._get(id_entreprise).listing(sort, ranges, offset, limit, after)
+
+    def suggest(self, id_entreprise, prefix, limit=SUGGEST_LIMIT):
+        with self._lock:
+            return self._get(id_entreprise).suggest(prefix, limit)
+
+    def applied(self, id_entreprise, version_before, change):
+        """Reporte sur l'index une écriture faite depuis `version_before`."""
+        version = storage.get_products_version(id_entreprise)
+        with self._lock:
+            index = self._indexes.get(str(id_entreprise))
+            if index is None:
+                return
+            if index.version == version_before and version == (version_before[0], version_before[1] + 1):
+                change(index)
+                index.version = version
+            else:
+                del self._indexes[str(id_entreprise)]
+
+
+catalog_indexes = CatalogIndexes()
+
+
+# ---------- Fiches produits (fragments HTML) ----------
+
+class ProductCardCache:
+    """Fiches produits déjà rendues (template product_card.html), par id produit.
+
+    Chaque fragment est stocké avec la révision du produit qu'il affiche
+    (Product.revision, renouvelée par le stockage à chaque écriture) : la
+    comparaison est celle de deux entiers, et un produit modifié, même par
+    un autre processus, est rendu à nouveau. update_product / delete_product
+    libèrent en plus l'entrée tout de suite. Au-delà de `max_size` fiches,
+    les moins récemment affichées sont évincées.
+    """
+
+    def __init__(self, max_size=PRODUCT_CARD_CACHE_SIZE):
+        self.max_size = max_size
+        self._cards = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def render(self, products):
+        """HTML des fiches des produits, dans l'ordre."""
+        cards = []
+        missing = []
+        with self._lock:
+            for product in products:
+                key = product.id
+                cached = self._cards.get(key)
+                if cached is not None and cached[0] == product.revision:
+                    self._cards.move_to_end(key)
+                    cards.append(cached[1])
+                    self.hits += 1
+                else:
+                    missing.append((len(cards), product))
+                    cards.append(None)
+                    self.misses += 1
+        if missing:
+            # Rendu hors verrou : seules les fiches absentes passent par Jinja
+            template = app.jinja_env.get_template('product_card.html')
+            for position, product in missing:
+                cards[position] = Markup(template.render(p=product))
+            with self._lock:
+                for position, product in missing:
+                    self._cards[product.id] = (product.revision, cards[position])
+                    self._cards.move_to_end(product.id)
+                while len(self._cards) > self.max_size:
+                    self._cards.popitem(last=False)
+        return Markup('').join(cards)
+
+    def discard(self, product_id):
+        with self._lock:
+            self._cards.pop(str(product_id), None)
+
+    def metrics(self):
+        with self._lock:
+            return {'size': len(self._cards), 'hits': self.hits, 'misses': self.misses}
+
+
+product_cards = ProductCardCache()
+
+
+# ---------- Produits ----------
 
 def get_products_by_entreprise(id_entreprise):
-    products = []
-    if not os.path.exists(PRODUCTS_FILE):
-        return products
-    with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['id_entreprise'] == str(id_entreprise):
-                products.append(row)
-    return products
+    return storage.get_products_by_entreprise(id_entreprise)
 
 
 def get_product_by_id(product_id, entreprise_id):
     """Retourne un produit par id, en vérifiant qu'il appartient bien à l'entreprise."""
-    if not os.path.exists(PRODUCTS_FILE):
-        return None
-    with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['id'] == str(product_id) and row['id_entreprise'] == str(entreprise_id):
-                return row
-    return None
+    return storage.get_product_by_id(product_id, entreprise_id)
 
 
-def write_all_products(products):
-    """Réécrit tout le fichier produits (pour update/delete)."""
-    with open(PRODUCTS_FILE, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ['id', 'nom', 'description', 'prix', 'quantite', 'id_entreprise', 'image_url']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for p in products:
-            writer.writerow(p)
+def get_entreprise_stats(id_entreprise):
+    """Nombre de produits, quantité et valeur totales du stock d'une entreprise (O(1))."""
+    return storage.get_entreprise_stats(id_entreprise)
+
+
+def get_all_entreprise_stats():
+    """Agrégats de toutes les entreprises en un seul appel : {id (str) -> stats}."""
+    return storage.get_all_entreprise_stats()
+
+
+def list_products(id_entreprise, sort='id', ranges=None, offset=0, limit=None, after=None):
+    """Produits d'une entreprise triés selon `sort` et filtrés par intervalles
+    (ex. {'prix': (10, None)}), servis par les index secondaires.
+
+    Retourne (nombre total, produits de la tranche [offset, offset + limit)) ;
+    avec `after` (id d'un produit), la tranche commence juste après lui.
+    """
+    return catalog_indexes.listing(id_entreprise, sort, ranges, offset, limit, after)
+
+
+def search_products(id_entreprise, q, offset=0, limit=None, sort=None, ranges=None, after=None):
+    """Recherche des produits dont le nom ou la description contient tous les mots de `q`.
+
+    Classée par pertinence (BM25), ou selon `sort` s'il est donné ; même
+    retour que list_products.
+    """
+    return catalog_indexes.search(id_entreprise, q, offset, limit, sort, ranges, after)
+
+
+def fuzzy_search_products(id_entreprise, q, offset=0, limit=None, ranges=None, after=None):
+    """Recherche approchée sur les noms (fautes de frappe), même retour que list_products."""
+    return catalog_indexes.fuzzy_search(id_entreprise, q, offset, limit, ranges, after)
+
+
+def suggest_products(id_entreprise, prefix, limit=SUGGEST_LIMIT):
+    """Produits dont le nom ou un de ses mots commence par `prefix` (autocomplétion)."""
+    return catalog_indexes.suggest(id_entreprise, prefix, limit)
 
 
 def add_product(nom, description, prix, quantite, id_entreprise, image_url=''):
-    product_id = get_next_id(PRODUCTS_FILE)
-    with open(PRODUCTS_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([product_id, nom, description, prix, quantite, id_entreprise, image_url])
+    """Ajoute un produit ; ValueError si le prix, la quantité ou l'URL de l'image est invalide."""
+    prix, quantite, image_url = parse_price(prix), parse_quantity(quantite), parse_image_url(image_url)
+    version = storage.get_products_version(id_entreprise)
+    product_id = storage.add_product({
+        'nom': nom,
+        'description': description,
+        'prix': str(prix),
+        'quantite': quantite,
+        'id_entreprise': id_entreprise,
+        'image_url': externalize_image(image_url),
+    })
+    product = get_product_by_id(product_id, id_entreprise)
+    catalog_indexes.applied(id_entreprise, version, lambda index: index.add(product))
     return product_id
 
 
 def update_product(product_id, entreprise_id, nom, description, prix, quantite, image_url=''):
-    products = []
-    if not os.path.exists(PRODUCTS_FILE):
+    """Modifie un produit ; ValueError si le prix, la quantité ou l'URL de l'image est invalide.
+
+    Une image inchangée n'est pas revérifiée : les valeurs enregistrées avant
+    parse_image_url (`//cdn/...`, autres schémas) restent modifiables.
+    """
+    prix, quantite = parse_price(prix), parse_quantity(quantite)
+    current = get_product_by_id(product_id, entreprise_id)
+    if current is None:
         return False
-
-    updated = False
-    with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['id'] == str(product_id) and row['id_entreprise'] == str(entreprise_id):
-                row['nom'] = nom
-                row['description'] = description
-                row['prix'] = prix
-                row['quantite'] = quantite
-                row['image_url'] = image_url
-                updated = True
-            products.append(row)
-
+    if image_url != current.image_url:
+        image_url = parse_image_url(image_url)
+    version = storage.get_products_version(entreprise_id)
+    updated = storage.update_product(product_id, entreprise_id, {
+        'nom': nom,
+        'description': description,
+        'prix': str(prix),
+        'quantite': quantite,
+        'image_url': externalize_image(image_url),
+    })
     if updated:
-        write_all_products(products)
-
+        product = get_product_by_id(product_id, entreprise_id)
+        catalog_indexes.applied(entreprise_id, version, lambda index: index.add(product))
+        product_cards.discard(product_id)
     return updated
 
 
 def delete_product(product_id, entreprise_id):
-    products = []
-    deleted = False
-    if not os.path.exists(PRODUCTS_FILE):
-        return False
+    version = storage.get_products_version(entreprise_id)
+    deleted = storage.delete_product(product_id, entreprise_id)
+    if deleted:
+        catalog_indexes.applied(entreprise_id, version, lambda index: index.remove(product_id))
+        product_cards.discard(product_id)
+    return deleted
 
-    with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['id'] == str(product_id) and row['id_entreprise'] == str(entreprise_id):
-                deleted = True
-                continue
-            products.append(row)
 
-    if deleted:
-        write_all_products(products)
+# ---------- Migration CSV -> SQLite ----------
+
+def migrate_csv_to_sqlite(db_path=SQLITE_FILE):
+    """Copie users / entreprises / produits des CSV vers une base SQLite.
+
+    Les ids sont conservés ; relancer la migration remplace les lignes déjà copiées.
+    """
+    source = CsvBackend()
+    entreprises = source.get_all_entreprises()
+    users = source.get_all_users()
+    for user in users:
+        user['id_entreprise'] = user.get('id_entreprise') or None
+    products = source.get_all_products()
+
+    target = SqliteBackend(db_path)
+    target.init()
+    conn = target._conn()
+    with conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO entreprises (id, nom, nom_key, created_at) '
+            'VALUES (:id, :nom, :nom_key, :created_at)',
+            [{**entreprise, 'nom_key': entreprise['nom'].casefold()} for entreprise in entreprises]
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO users (id, nom, email, mdp, role, created_at, id_entreprise) '
+            'VALUES (:id, :nom, :email, :mdp, :role, :created_at, :id_entreprise)',
+            users
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO products (id, nom, description, prix, quantite, id_entreprise, image_url, '
+            'revision) VALUES (:id, :nom, :description, :prix, :quantite, :id_entreprise, :image_url, :revision)',
+            [{**product.as_row(), 'revision': time.time_ns()} for product in products]
+        )
+    # INSERT OR REPLACE ne déclenche pas les triggers de suppression : recalcul complet
+    target.rebuild_stats()
+    return {'entreprises': len(entreprises), 'users': len(users), 'products': len(products)}
 
-    return deleted
+
+@app.cli.command('migrate-sqlite')
+def migrate_sqlite_command():
+    """Migre les fichiers CSV vers SQLITE_FILE (flask --app app migrate-sqlite)."""
+    counts = migrate_csv_to_sqlite()
+    for table, count in counts.items():
+        print(f'{table} : {count} ligne(s) migrée(s) vers {SQLITE_FILE}')
 
 
 # ---------- Templates ----------
@@ -242,293 +2448,8 @@ AUTH_TEMPLATE = '''
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Manrope:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --primary: #1e3a8a;
-            --primary-dark: #1e40af;
-            --primary-light: #3b82f6;
-            --accent: #06b6d4;
-            --bg-main: #f8fafc;
-            --bg-card: #ffffff;
-            --text-primary: #0f172a;
-            --text-secondary: #64748b;
-            --border: #e2e8f0;
-            --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-            --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.1);
-            --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Manrope', sans-serif;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            background: linear-gradient(135deg, #f8fafc 0%, #e0f2fe 100%);
-            padding: 20px;
-            position: relative;
-        }
-        
-        body::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background-image: 
-                radial-gradient(circle at 20% 50%, rgba(59, 130, 246, 0.08) 0%, transparent 50%),
-                radial-gradient(circle at 80% 80%, rgba(6, 182, 212, 0.08) 0%, transparent 50%);
-            pointer-events: none;
-        }
-        
-        .container {
-            width: 100%;
-            max-width: 440px;
-            position: relative;
-            z-index: 1;
-            animation: slideUp 0.6s ease-out;
-        }
-        
-        @keyframes slideUp {
-            from {
-                opacity: 0;
-                transform: translateY(30px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .logo {
-            text-align: center;
-            margin-bottom: 32px;
-        }
-        
-        .logo-icon {
-            width: 56px;
-            height: 56px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);
-            border-radius: 16px;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            margin-bottom: 16px;
-            box-shadow: var(--shadow-lg);
-        }
-        
-        .logo-icon svg {
-            width: 28px;
-            height: 28px;
-            stroke: white;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .logo h1 {
-            font-size: 28px;
-            font-weight: 700;
-            color: var(--text-primary);
-            letter-spacing: -0.5px;
-            margin-bottom: 8px;
-        }
-        
-        .logo p {
-            font-size: 15px;
-            color: var(--text-secondary);
-            font-weight: 400;
-        }
-        
-        .auth-card {
-            background: var(--bg-card);
-            border-radius: 20px;
-            padding: 40px;
-            box-shadow: var(--shadow-lg), 0 0 0 1px rgba(0, 0, 0, 0.05);
-            border: 1px solid var(--border);
-        }
-        
-        .tabs {
-            display: flex;
-            gap: 8px;
-            margin-bottom: 32px;
-            background: var(--bg-main);
-            padding: 4px;
-            border-radius: 12px;
-        }
-        
-        .tab {
-            flex: 1;
-            padding: 10px 20px;
-            border: none;
-            background: transparent;
-            color: var(--text-secondary);
-            font-size: 15px;
-            font-weight: 600;
-            cursor: pointer;
-            border-radius: 10px;
-            transition: all 0.3s ease;
-            font-family: 'Manrope', sans-serif;
-        }
-        
-        .tab.active {
-            background: white;
-            color: var(--primary);
-            box-shadow: var(--shadow-sm);
-        }
-        
-        .tab:hover:not(.active) {
-            color: var(--text-primary);
-        }
-        
-        .tab-content {
-            display: none;
-        }
-        
-        .tab-content.active {
-            display: block;
-            animation: fadeIn 0.4s ease-out;
-        }
-        
-        @keyframes fadeIn {
-            from {
-                opacity: 0;
-            }
-            to {
-                opacity: 1;
-            }
-        }
-        
-        .form-group {
-            margin-bottom: 20px;
-        }
-        
-        .form-group label {
-            display: block;
-            margin-bottom: 8px;
-            color: var(--text-primary);
-            font-size: 14px;
-            font-weight: 600;
-        }
-        
-        .form-group input {
-            width: 100%;
-            padding: 12px 16px;
-            border: 1.5px solid var(--border);
-            border-radius: 10px;
-            font-size: 15px;
-            font-family: 'Manrope', sans-serif;
-            color: var(--text-primary);
-            background: white;
-            transition: all 0.2s ease;
-        }
-        
-        .form-group input:focus {
-            outline: none;
-            border-color: var(--primary-light);
-            box-shadow: 0 0 0 4px rgba(59, 130, 246, 0.1);
-        }
-        
-        .form-group input::placeholder {
-            color: var(--text-secondary);
-            opacity: 0.6;
-        }
-        
-        .submit-btn {
-            width: 100%;
-            padding: 14px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-size: 16px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            font-family: 'Manrope', sans-serif;
-            box-shadow: var(--shadow-md);
-            margin-top: 8px;
-        }
-        
-        .submit-btn:hover {
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-lg);
-        }
-        
-        .submit-btn:active {
-            transform: translateY(0);
-        }
-        
-        .alert {
-            padding: 14px 16px;
-            border-radius: 10px;
-            margin-bottom: 20px;
-            font-size: 14px;
-            font-weight: 500;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-            animation: slideDown 0.4s ease-out;
-        }
-        
-        @keyframes slideDown {
-            from {
-                opacity: 0;
-                transform: translateY(-10px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .alert-error {
-            background: #fef2f2;
-            color: #991b1b;
-            border: 1px solid #fecaca;
-        }
-        
-        .alert-success {
-            background: #f0fdf4;
-            color: #166534;
-            border: 1px solid #bbf7d0;
-        }
-        
-        .alert::before {
-            content: '';
-            width: 4px;
-            height: 100%;
-            position: absolute;
-            left: 0;
-            top: 0;
-            bottom: 0;
-            border-radius: 10px 0 0 10px;
-        }
-        
-        .alert-error::before {
-            background: #dc2626;
-        }
-        
-        .alert-success::before {
-            background: #16a34a;
-        }
-        
-        @media (max-width: 480px) {
-            .auth-card {
-                padding: 28px;
-            }
-            
-            .logo h1 {
-                font-size: 24px;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/common.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('css/auth.css') }}">
 </head>
 <body>
     <div class="container">
@@ -636,353 +2557,8 @@ DASHBOARD_TEMPLATE = '''
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Manrope:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --primary: #1e3a8a;
-            --primary-dark: #1e40af;
-            --primary-light: #3b82f6;
-            --accent: #06b6d4;
-            --bg-main: #f8fafc;
-            --bg-card: #ffffff;
-            --text-primary: #0f172a;
-            --text-secondary: #64748b;
-            --border: #e2e8f0;
-            --success: #16a34a;
-            --warning: #f59e0b;
-            --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-            --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.1);
-            --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Manrope', sans-serif;
-            background: var(--bg-main);
-            color: var(--text-primary);
-            min-height: 100vh;
-        }
-        
-        .navbar {
-            background: var(--bg-card);
-            border-bottom: 1px solid var(--border);
-            padding: 16px 32px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: var(--shadow-sm);
-            position: sticky;
-            top: 0;
-            z-index: 100;
-        }
-        
-        .navbar-brand {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }
-        
-        .navbar-logo {
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-        
-        .navbar-logo svg {
-            width: 20px;
-            height: 20px;
-            stroke: white;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .navbar-title {
-            font-size: 20px;
-            font-weight: 700;
-            color: var(--text-primary);
-        }
-        
-        .navbar-right {
-            display: flex;
-            align-items: center;
-            gap: 24px;
-        }
-        
-        .navbar-user {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }
-        
-        .navbar-user-info {
-            text-align: right;
-        }
-        
-        .navbar-user-name {
-            font-size: 14px;
-            font-weight: 600;
-            color: var(--text-primary);
-        }
-        
-        .navbar-user-company {
-            font-size: 13px;
-            color: var(--text-secondary);
-        }
-        
-        .navbar-avatar {
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--accent) 0%, var(--primary-light) 100%);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-weight: 600;
-            color: white;
-            font-size: 16px;
-        }
-        
-        .logout-btn {
-            padding: 8px 16px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 8px;
-            color: var(--text-secondary);
-            text-decoration: none;
-            font-size: 14px;
-            font-weight: 500;
-            transition: all 0.2s ease;
-        }
-        
-        .logout-btn:hover {
-            background: white;
-            color: var(--text-primary);
-            border-color: var(--text-secondary);
-        }
-        
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 32px;
-        }
-        
-        .page-header {
-            margin-bottom: 32px;
-        }
-        
-        .page-title {
-            font-size: 32px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 8px;
-            letter-spacing: -0.5px;
-        }
-        
-        .page-subtitle {
-            font-size: 16px;
-            color: var(--text-secondary);
-        }
-        
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 24px;
-            margin-bottom: 32px;
-        }
-        
-        .stat-card {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 24px;
-            border: 1px solid var(--border);
-            box-shadow: var(--shadow-sm);
-            transition: all 0.3s ease;
-        }
-        
-        .stat-card:hover {
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-md);
-        }
-        
-        .stat-icon {
-            width: 48px;
-            height: 48px;
-            border-radius: 12px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            margin-bottom: 16px;
-        }
-        
-        .stat-icon svg {
-            width: 24px;
-            height: 24px;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .stat-icon.blue {
-            background: rgba(59, 130, 246, 0.1);
-        }
-        
-        .stat-icon.blue svg {
-            stroke: var(--primary-light);
-        }
-        
-        .stat-icon.green {
-            background: rgba(22, 163, 74, 0.1);
-        }
-        
-        .stat-icon.green svg {
-            stroke: var(--success);
-        }
-        
-        .stat-icon.cyan {
-            background: rgba(6, 182, 212, 0.1);
-        }
-        
-        .stat-icon.cyan svg {
-            stroke: var(--accent);
-        }
-        
-        .stat-label {
-            font-size: 14px;
-            color: var(--text-secondary);
-            font-weight: 500;
-            margin-bottom: 8px;
-        }
-        
-        .stat-value {
-            font-size: 32px;
-            font-weight: 700;
-            color: var(--text-primary);
-            letter-spacing: -1px;
-        }
-        
-        .quick-actions {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 32px;
-            border: 1px solid var(--border);
-            box-shadow: var(--shadow-sm);
-        }
-        
-        .section-title {
-            font-size: 20px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 24px;
-        }
-        
-        .actions-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 16px;
-        }
-        
-        .action-card {
-            padding: 20px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 12px;
-            text-decoration: none;
-            color: var(--text-primary);
-            transition: all 0.3s ease;
-            display: flex;
-            align-items: center;
-            gap: 16px;
-        }
-        
-        .action-card:hover {
-            background: white;
-            border-color: var(--primary-light);
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-md);
-        }
-        
-        .action-icon {
-            width: 44px;
-            height: 44px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            flex-shrink: 0;
-        }
-        
-        .action-icon svg {
-            width: 22px;
-            height: 22px;
-            stroke: white;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .action-content {
-            flex: 1;
-        }
-        
-        .action-title {
-            font-size: 16px;
-            font-weight: 600;
-            margin-bottom: 4px;
-        }
-        
-        .action-description {
-            font-size: 13px;
-            color: var(--text-secondary);
-        }
-        
-        @media (max-width: 768px) {
-            .container {
-                padding: 20px;
-            }
-            
-            .navbar {
-                padding: 12px 20px;
-            }
-            
-            .navbar-right {
-                gap: 12px;
-            }
-            
-            .navbar-user-info {
-                display: none;
-            }
-            
-            .page-title {
-                font-size: 28px;
-            }
-            
-            .stats-grid {
-                grid-template-columns: 1fr;
-            }
-        }
-
-        .nav-link {
-    padding: 8px 16px;
-    border: 1.5px solid var(--border);
-    border-radius: 8px;
-    text-decoration: none;
-    font-size: 14px;
-    font-weight: 500;
-    transition: all 0.2s ease;
-}
-
-.nav-link:hover {
-    transform: translateY(-1px);
-    box-shadow: var(--shadow-md);
-}
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/common.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('css/dashboard.css') }}">
 </head>
 <body>
     <nav class="navbar">
@@ -1026,7 +2602,7 @@ DASHBOARD_TEMPLATE = '''
                     </svg>
                 </div>
                 <div class="stat-label">Total des produits</div>
-                <div class="stat-value">{{ products|length }}</div>
+                <div class="stat-value">{{ nb_products }}</div>
             </div>
             
             <div class="stat-card">
@@ -1084,6 +2660,48 @@ DASHBOARD_TEMPLATE = '''
 </html>
 '''
 
+# Fiche d'un produit, rendue une fois puis reprise du cache ProductCardCache
+PRODUCT_CARD_TEMPLATE = '''
+<div class="product-card">
+    <div class="product-image">
+        {% if p.image_url %}
+        <img src="{{ p.image_url }}" alt="{{ p.nom }}">
+        {% else %}
+        <div class="product-image-placeholder">
+            <svg viewBox="0 0 24 24">
+                <path d="M20 7h-4V4c0-1.1-.9-2-2-2h-4c-1.1 0-2 .9-2 2v3H4c-1.1 0-2 .9-2 2v11c0 1.1.9 2 2 2h16c1.1 0 2-.9 2-2V9c0-1.1-.9-2-2-2zM10 4h4v3h-4V4zm10 16H4V9h16v11z"/>
+            </svg>
+        </div>
+        {% endif %}
+    </div>
+
+    <div class="product-content">
+        <h3 class="product-name">{{ p.nom }}</h3>
+        <p class="product-description">{{ p.description or 'Aucune description' }}</p>
+
+        <div class="product-info">
+            <div class="product-info-item">
+                <div class="product-info-label">Prix</div>
+                <div class="product-info-value">{{ p.prix }} €</div>
+            </div>
+            <div class="product-info-item">
+                <div class="product-info-label">Quantité</div>
+                <div class="product-info-value">{{ p.quantite }}</div>
+            </div>
+        </div>
+
+        <div class="product-actions">
+            <a href="/products/{{ p.id }}/edit" class="btn-edit">Modifier</a>
+            <form method="POST" action="/products/{{ p.id }}/delete" style="display: inline;">
+                <button type="submit" class="btn-delete" onclick="return confirm('Êtes-vous sûr de vouloir supprimer ce produit ?')">
+                    Supprimer
+                </button>
+            </form>
+        </div>
+    </div>
+</div>
+'''
+
 PRODUCT_LIST_TEMPLATE = '''
 <!DOCTYPE html>
 <html lang="fr">
@@ -1094,440 +2712,8 @@ PRODUCT_LIST_TEMPLATE = '''
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Manrope:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --primary: #1e3a8a;
-            --primary-dark: #1e40af;
-            --primary-light: #3b82f6;
-            --accent: #06b6d4;
-            --bg-main: #f8fafc;
-            --bg-card: #ffffff;
-            --text-primary: #0f172a;
-            --text-secondary: #64748b;
-            --border: #e2e8f0;
-            --danger: #dc2626;
-            --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-            --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.1);
-            --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Manrope', sans-serif;
-            background: var(--bg-main);
-            color: var(--text-primary);
-            min-height: 100vh;
-        }
-        
-        .navbar {
-            background: var(--bg-card);
-            border-bottom: 1px solid var(--border);
-            padding: 16px 32px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: var(--shadow-sm);
-            position: sticky;
-            top: 0;
-            z-index: 100;
-        }
-        
-        .navbar-brand {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }
-        
-        .navbar-logo {
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-        
-        .navbar-logo svg {
-            width: 20px;
-            height: 20px;
-            stroke: white;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .navbar-title {
-            font-size: 20px;
-            font-weight: 700;
-            color: var(--text-primary);
-        }
-        
-        .navbar-right {
-            display: flex;
-            align-items: center;
-            gap: 16px;
-        }
-        
-        .nav-link {
-            padding: 8px 16px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 8px;
-            color: var(--text-secondary);
-            text-decoration: none;
-            font-size: 14px;
-            font-weight: 500;
-            transition: all 0.2s ease;
-        }
-        
-        .nav-link:hover {
-            background: white;
-            color: var(--text-primary);
-            border-color: var(--text-secondary);
-        }
-        
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 32px;
-        }
-        
-        .page-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 32px;
-            flex-wrap: wrap;
-            gap: 16px;
-        }
-        
-        .page-title {
-            font-size: 32px;
-            font-weight: 700;
-            color: var(--text-primary);
-            letter-spacing: -0.5px;
-        }
-        
-        .btn-primary {
-            padding: 12px 24px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-size: 15px;
-            font-weight: 600;
-            cursor: pointer;
-            text-decoration: none;
-            display: inline-flex;
-            align-items: center;
-            gap: 8px;
-            transition: all 0.3s ease;
-            box-shadow: var(--shadow-md);
-        }
-        
-        .btn-primary:hover {
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-lg);
-        }
-        
-        .btn-primary svg {
-            width: 18px;
-            height: 18px;
-            stroke: white;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .search-bar {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 24px;
-            border: 1px solid var(--border);
-            box-shadow: var(--shadow-sm);
-            margin-bottom: 24px;
-        }
-        
-        .search-form {
-            display: flex;
-            gap: 12px;
-        }
-        
-        .search-input {
-            flex: 1;
-            padding: 12px 16px;
-            border: 1.5px solid var(--border);
-            border-radius: 10px;
-            font-size: 15px;
-            font-family: 'Manrope', sans-serif;
-            color: var(--text-primary);
-            background: white;
-            transition: all 0.2s ease;
-        }
-        
-        .search-input:focus {
-            outline: none;
-            border-color: var(--primary-light);
-            box-shadow: 0 0 0 4px rgba(59, 130, 246, 0.1);
-        }
-        
-        .search-btn {
-            padding: 12px 24px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-size: 15px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.2s ease;
-        }
-        
-        .search-btn:hover {
-            transform: translateY(-1px);
-        }
-        
-        .products-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(320px, 1fr));
-            gap: 24px;
-            margin-bottom: 32px;
-        }
-        
-        .product-card {
-            background: var(--bg-card);
-            border-radius: 16px;
-            border: 1px solid var(--border);
-            overflow: hidden;
-            transition: all 0.3s ease;
-            box-shadow: var(--shadow-sm);
-        }
-        
-        .product-card:hover {
-            transform: translateY(-4px);
-            box-shadow: var(--shadow-lg);
-        }
-        
-        .product-image {
-            width: 100%;
-            height: 200px;
-            background: var(--bg-main);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .product-image img {
-            width: 100%;
-            height: 100%;
-            object-fit: cover;
-        }
-        
-        .product-image-placeholder {
-            width: 80px;
-            height: 80px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);
-            border-radius: 16px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-        
-        .product-image-placeholder svg {
-            width: 40px;
-            height: 40px;
-            stroke: white;
-            stroke-width: 2;
-            fill: none;
-        }
-        
-        .product-content {
-            padding: 20px;
-        }
-        
-        .product-name {
-            font-size: 18px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 8px;
-        }
-        
-        .product-description {
-            font-size: 14px;
-            color: var(--text-secondary);
-            margin-bottom: 16px;
-            line-height: 1.5;
-            display: -webkit-box;
-            -webkit-line-clamp: 2;
-            -webkit-box-orient: vertical;
-            overflow: hidden;
-        }
-        
-        .product-info {
-            display: flex;
-            gap: 16px;
-            margin-bottom: 16px;
-            padding: 12px;
-            background: var(--bg-main);
-            border-radius: 10px;
-        }
-        
-        .product-info-item {
-            flex: 1;
-        }
-        
-        .product-info-label {
-            font-size: 12px;
-            color: var(--text-secondary);
-            font-weight: 500;
-            margin-bottom: 4px;
-        }
-        
-        .product-info-value {
-            font-size: 16px;
-            font-weight: 700;
-            color: var(--text-primary);
-        }
-        
-        .product-actions {
-            display: flex;
-            gap: 8px;
-        }
-        
-        .btn-edit {
-            flex: 1;
-            padding: 10px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 8px;
-            color: var(--text-primary);
-            text-decoration: none;
-            font-size: 14px;
-            font-weight: 600;
-            text-align: center;
-            transition: all 0.2s ease;
-        }
-        
-        .btn-edit:hover {
-            background: white;
-            border-color: var(--primary-light);
-            color: var(--primary-light);
-        }
-        
-        .btn-delete {
-            padding: 10px 16px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 8px;
-            color: var(--danger);
-            cursor: pointer;
-            font-size: 14px;
-            font-weight: 600;
-            transition: all 0.2s ease;
-        }
-        
-        .btn-delete:hover {
-            background: #fee;
-            border-color: var(--danger);
-        }
-        
-        .pagination {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            gap: 8px;
-            margin-top: 32px;
-        }
-        
-        .pagination a,
-        .pagination span {
-            padding: 10px 16px;
-            background: var(--bg-card);
-            border: 1.5px solid var(--border);
-            border-radius: 8px;
-            text-decoration: none;
-            color: var(--text-primary);
-            font-weight: 600;
-            transition: all 0.2s ease;
-        }
-        
-        .pagination a:hover {
-            background: white;
-            border-color: var(--primary-light);
-            color: var(--primary-light);
-        }
-        
-        .pagination span.current {
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            border-color: var(--primary);
-        }
-        
-        .empty-state {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 64px 32px;
-            text-align: center;
-            border: 1px solid var(--border);
-        }
-        
-        .empty-icon {
-            width: 80px;
-            height: 80px;
-            background: var(--bg-main);
-            border-radius: 20px;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            margin-bottom: 24px;
-        }
-        
-        .empty-icon svg {
-            width: 40px;
-            height: 40px;
-            stroke: var(--text-secondary);
-            stroke-width: 2;
-            fill: none;
-        }
-        
-        .empty-title {
-            font-size: 24px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 8px;
-        }
-        
-        .empty-text {
-            font-size: 16px;
-            color: var(--text-secondary);
-            margin-bottom: 24px;
-        }
-        
-        @media (max-width: 768px) {
-            .container {
-                padding: 20px;
-            }
-            
-            .navbar {
-                padding: 12px 20px;
-            }
-            
-            .page-header {
-                flex-direction: column;
-                align-items: flex-start;
-            }
-            
-            .products-grid {
-                grid-template-columns: 1fr;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/common.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('css/product_list.css') }}">
 </head>
 <body>
     <nav class="navbar">
@@ -1562,73 +2748,68 @@ PRODUCT_LIST_TEMPLATE = '''
                 <input 
                     type="text" 
                     name="q" 
+                    id="search-input"
                     class="search-input" 
                     placeholder="Rechercher un produit..."
+                    autocomplete="off"
+                    list="suggestions"
                     value="{{ q }}">
+                <datalist id="suggestions"></datalist>
                 <button type="submit" class="search-btn">Rechercher</button>
             </form>
+            <form method="GET" action="/products" class="filters-form">
+                {% if q %}<input type="hidden" name="q" value="{{ q }}">{% endif %}
+                <label>
+                    Trier par
+                    <select name="sort">
+                        <option value="">{% if q %}Pertinence{% else %}Ordre d'ajout{% endif %}</option>
+                        {% for key, label in sorts.items() %}
+                        <option value="{{ key }}" {% if key == sort %}selected{% endif %}>{{ label }}</option>
+                        {% endfor %}
+                    </select>
+                </label>
+                <label>
+                    Prix min
+                    <input type="number" name="prix_min" step="0.01" min="0" value="{{ filters.prix_min }}">
+                </label>
+                <label>
+                    Prix max
+                    <input type="number" name="prix_max" step="0.01" min="0" value="{{ filters.prix_max }}">
+                </label>
+                <label>
+                    Stock max
+                    <input type="number" name="stock_max" step="1" value="{{ filters.stock_max }}">
+                </label>
+                <button type="submit" class="filters-btn">Appliquer</button>
+            </form>
+            {% if fuzzy %}
+            <p class="search-hint">Aucun produit ne correspond exactement à « {{ q }} » : voici les noms les plus proches.</p>
+            {% endif %}
         </div>
         
-        {% if products %}
-        <div class="products-grid">
-            {% for p in products %}
-            <div class="product-card">
-                <div class="product-image">
-                    {% if p.image_url %}
-                    <img src="{{ p.image_url }}" alt="{{ p.nom }}">
-                    {% else %}
-                    <div class="product-image-placeholder">
-                        <svg viewBox="0 0 24 24">
-                            <path d="M20 7h-4V4c0-1.1-.9-2-2-2h-4c-1.1 0-2 .9-2 2v3H4c-1.1 0-2 .9-2 2v11c0 1.1.9 2 2 2h16c1.1 0 2-.9 2-2V9c0-1.1-.9-2-2-2zM10 4h4v3h-4V4zm10 16H4V9h16v11z"/>
-                        </svg>
-                    </div>
-                    {% endif %}
-                </div>
-                
-                <div class="product-content">
-                    <h3 class="product-name">{{ p.nom }}</h3>
-                    <p class="product-description">{{ p.description or 'Aucune description' }}</p>
-                    
-                    <div class="product-info">
-                        <div class="product-info-item">
-                            <div class="product-info-label">Prix</div>
-                            <div class="product-info-value">{{ p.prix }} €</div>
-                        </div>
-                        <div class="product-info-item">
-                            <div class="product-info-label">Quantité</div>
-                            <div class="product-info-value">{{ p.quantite }}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="product-actions">
-                        <a href="/products/{{ p.id }}/edit" class="btn-edit">Modifier</a>
-                        <form method="POST" action="/products/{{ p.id }}/delete" style="display: inline;">
-                            <button type="submit" class="btn-delete" onclick="return confirm('Êtes-vous sûr de vouloir supprimer ce produit ?')">
-                                Supprimer
-                            </button>
-                        </form>
-                    </div>
-                </div>
-            </div>
-            {% endfor %}
+        {% if products %}
+        <div class="products-grid">
+            {{ cards }}
         </div>
         
         {% if total_pages > 1 %}
         <div class="pagination">
             {% if page > 1 %}
-            <a href="?page={{ page - 1 }}{% if q %}&q={{ q }}{% endif %}">Précédent</a>
+            <a href="{{ url_for('product_list', page=page - 1, **filters) }}">Précédent</a>
             {% endif %}
             
-            {% for p in range(1, total_pages + 1) %}
-                {% if p == page %}
+            {% for p in page_links %}
+                {% if p is none %}
+                <span class="ellipsis">…</span>
+                {% elif p == page %}
                 <span class="current">{{ p }}</span>
                 {% else %}
-                <a href="?page={{ p }}{% if q %}&q={{ q }}{% endif %}">{{ p }}</a>
+                <a href="{{ url_for('product_list', page=p, **filters) }}">{{ p }}</a>
                 {% endif %}
             {% endfor %}
             
             {% if page < total_pages %}
-            <a href="?page={{ page + 1 }}{% if q %}&q={{ q }}{% endif %}">Suivant</a>
+            <a href="{{ url_for('product_list', page=page + 1, after=products[-1].id, **filters) }}">Suivant</a>
             {% endif %}
         </div>
         {% endif %}
@@ -1651,6 +2832,39 @@ PRODUCT_LIST_TEMPLATE = '''
         </div>
         {% endif %}
     </div>
+    
+    <script>
+        // Suggestions après 200 ms sans frappe ; une requête plus ancienne est annulée
+        const searchInput = document.getElementById('search-input');
+        const suggestions = document.getElementById('suggestions');
+        let suggestTimer = null;
+        let suggestRequest = null;
+        
+        searchInput.addEventListener('input', function() {
+            clearTimeout(suggestTimer);
+            const q = searchInput.value.trim();
+            if (q.length < 2) {
+                suggestions.replaceChildren();
+                return;
+            }
+            suggestTimer = setTimeout(function() {
+                if (suggestRequest) {
+                    suggestRequest.abort();
+                }
+                suggestRequest = new AbortController();
+                fetch('/products/suggest?q=' + encodeURIComponent(q), { signal: suggestRequest.signal })
+                    .then(function(response) { return response.ok ? response.json() : []; })
+                    .then(function(items) {
+                        suggestions.replaceChildren(...items.map(function(item) {
+                            const option = document.createElement('option');
+                            option.value = item.nom;
+                            return option;
+                        }));
+                    })
+                    .catch(function() {});
+            }, 200);
+        });
+    </script>
 </body>
 </html>
 '''
@@ -1665,264 +2879,8 @@ PRODUCT_FORM_TEMPLATE = """
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Manrope:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --primary: #1e3a8a;
-            --primary-dark: #1e40af;
-            --primary-light: #3b82f6;
-            --accent: #06b6d4;
-            --bg-main: #f8fafc;
-            --bg-card: #ffffff;
-            --text-primary: #0f172a;
-            --text-secondary: #64748b;
-            --border: #e2e8f0;
-            --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-            --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.1);
-            --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Manrope', sans-serif;
-            background: var(--bg-main);
-            color: var(--text-primary);
-            min-height: 100vh;
-        }
-        
-        .navbar {
-            background: var(--bg-card);
-            border-bottom: 1px solid var(--border);
-            padding: 16px 32px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: var(--shadow-sm);
-            position: sticky;
-            top: 0;
-            z-index: 100;
-        }
-        
-        .navbar-brand {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }
-        
-        .navbar-logo {
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-        
-        .navbar-logo svg {
-            width: 20px;
-            height: 20px;
-            stroke: white;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .navbar-title {
-            font-size: 20px;
-            font-weight: 700;
-            color: var(--text-primary);
-        }
-        
-        .navbar-right {
-            display: flex;
-            align-items: center;
-            gap: 16px;
-        }
-        
-        .nav-link {
-            padding: 8px 16px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 8px;
-            color: var(--text-secondary);
-            text-decoration: none;
-            font-size: 14px;
-            font-weight: 500;
-            transition: all 0.2s ease;
-        }
-        
-        .nav-link:hover {
-            background: white;
-            color: var(--text-primary);
-            border-color: var(--text-secondary);
-        }
-        
-        .container {
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 32px;
-        }
-        
-        .page-header {
-            margin-bottom: 32px;
-        }
-        
-        .page-title {
-            font-size: 32px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 8px;
-            letter-spacing: -0.5px;
-        }
-        
-        .page-subtitle {
-            font-size: 16px;
-            color: var(--text-secondary);
-        }
-        
-        .form-card {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 32px;
-            border: 1px solid var(--border);
-            box-shadow: var(--shadow-sm);
-        }
-        
-        .form-group {
-            margin-bottom: 24px;
-        }
-        
-        .form-group label {
-            display: block;
-            margin-bottom: 8px;
-            color: var(--text-primary);
-            font-size: 14px;
-            font-weight: 600;
-        }
-        
-        .form-group input,
-        .form-group textarea {
-            width: 100%;
-            padding: 12px 16px;
-            border: 1.5px solid var(--border);
-            border-radius: 10px;
-            font-size: 15px;
-            font-family: 'Manrope', sans-serif;
-            color: var(--text-primary);
-            background: white;
-            transition: all 0.2s ease;
-        }
-        
-        .form-group textarea {
-            min-height: 120px;
-            resize: vertical;
-        }
-        
-        .form-group input:focus,
-        .form-group textarea:focus {
-            outline: none;
-            border-color: var(--primary-light);
-            box-shadow: 0 0 0 4px rgba(59, 130, 246, 0.1);
-        }
-        
-        .form-group input::placeholder,
-        .form-group textarea::placeholder {
-            color: var(--text-secondary);
-            opacity: 0.6;
-        }
-        
-        .form-row {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 16px;
-        }
-        
-        .image-preview {
-            margin-top: 16px;
-            border-radius: 12px;
-            overflow: hidden;
-            display: none;
-            border: 1px solid var(--border);
-        }
-        
-        .image-preview img {
-            width: 100%;
-            max-height: 300px;
-            object-fit: cover;
-        }
-        
-        .form-actions {
-            display: flex;
-            gap: 12px;
-            margin-top: 32px;
-            padding-top: 24px;
-            border-top: 1px solid var(--border);
-        }
-        
-        .btn-primary {
-            flex: 1;
-            padding: 14px 24px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-size: 16px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            font-family: 'Manrope', sans-serif;
-            box-shadow: var(--shadow-md);
-        }
-        
-        .btn-primary:hover {
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-lg);
-        }
-        
-        .btn-secondary {
-            padding: 14px 24px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 10px;
-            color: var(--text-primary);
-            text-decoration: none;
-            font-size: 16px;
-            font-weight: 600;
-            text-align: center;
-            transition: all 0.2s ease;
-        }
-        
-        .btn-secondary:hover {
-            background: white;
-            border-color: var(--text-secondary);
-        }
-        
-        @media (max-width: 768px) {
-            .container {
-                padding: 20px;
-            }
-            
-            .navbar {
-                padding: 12px 20px;
-            }
-            
-            .form-card {
-                padding: 24px;
-            }
-            
-            .form-row {
-                grid-template-columns: 1fr;
-            }
-            
-            .form-actions {
-                flex-direction: column-reverse;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/common.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('css/product_form.css') }}">
 </head>
 <body>
     <nav class="navbar">
@@ -1949,38 +2907,41 @@ PRODUCT_FORM_TEMPLATE = """
         </div>
         
         <div class="form-card">
+            {% if error %}
+            <div class="alert alert-error">{{ error }}</div>
+            {% endif %}
             <form method="POST">
                 <div class="form-group">
                     <label>Nom du produit</label>
                     <input type="text" name="nom" placeholder="Ex: Ordinateur portable Dell" 
-                           value="{{ product.nom if product else '' }}" required>
+                           value="{{ form.get('nom', product.nom if product else '') }}" required>
                 </div>
                 
                 <div class="form-group">
                     <label>Description</label>
                     <textarea name="description" 
-                              placeholder="Décrivez votre produit...">{{ product.description if product else '' }}</textarea>
+                              placeholder="Décrivez votre produit...">{{ form.get('description', product.description if product else '') }}</textarea>
                 </div>
                 
                 <div class="form-row">
                     <div class="form-group">
                         <label>Prix (€)</label>
                         <input type="number" name="prix" step="0.01" placeholder="0.00" 
-                               value="{{ product.prix if product else '' }}" required>
+                               value="{{ form.get('prix', product.prix if product else '') }}" required>
                     </div>
                     
                     <div class="form-group">
                         <label>Quantité</label>
                         <input type="number" name="quantite" placeholder="0" 
-                               value="{{ product.quantite if product else '' }}" required>
+                               value="{{ form.get('quantite', product.quantite if product else '') }}" required>
                     </div>
                 </div>
                 
                 <div class="form-group">
                     <label>URL de l'image (optionnel)</label>
-                    <input type="url" name="image_url" id="image_url" 
+                    <input type="text" inputmode="url" name="image_url" id="image_url" 
                            placeholder="https://exemple.com/image.jpg"
-                           value="{{ product.image_url if product else '' }}"
+                           value="{{ form.get('image_url', product.image_url if product else '') }}"
                            onchange="previewImage()">
                     <div id="preview" class="image-preview">
                         <img id="preview-img" src="" alt="Aperçu">
@@ -2032,311 +2993,8 @@ ADMIN_ENTREPRISES_TEMPLATE = '''
     <link rel="preconnect" href="https://fonts.googleapis.com">
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
     <link href="https://fonts.googleapis.com/css2?family=Manrope:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {
-            --primary: #1e3a8a;
-            --primary-dark: #1e40af;
-            --primary-light: #3b82f6;
-            --accent: #06b6d4;
-            --bg-main: #f8fafc;
-            --bg-card: #ffffff;
-            --text-primary: #0f172a;
-            --text-secondary: #64748b;
-            --border: #e2e8f0;
-            --admin-badge: #8b5cf6;
-            --shadow-sm: 0 1px 2px 0 rgb(0 0 0 / 0.05);
-            --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.1);
-            --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-        }
-        
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: 'Manrope', sans-serif;
-            background: var(--bg-main);
-            color: var(--text-primary);
-            min-height: 100vh;
-        }
-        
-        .navbar {
-            background: var(--bg-card);
-            border-bottom: 1px solid var(--border);
-            padding: 16px 32px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            box-shadow: var(--shadow-sm);
-            position: sticky;
-            top: 0;
-            z-index: 100;
-        }
-        
-        .navbar-brand {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }
-        
-        .navbar-logo {
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--admin-badge) 0%, #a78bfa 100%);
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-        
-        .navbar-logo svg {
-            width: 20px;
-            height: 20px;
-            stroke: white;
-            stroke-width: 2.5;
-            fill: none;
-        }
-        
-        .navbar-title {
-            font-size: 20px;
-            font-weight: 700;
-            color: var(--text-primary);
-        }
-        
-        .admin-badge {
-            display: inline-block;
-            padding: 4px 12px;
-            background: linear-gradient(135deg, var(--admin-badge) 0%, #a78bfa 100%);
-            border-radius: 20px;
-            font-size: 12px;
-            margin-left: 8px;
-            font-weight: 600;
-            color: white;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }
-        
-        .navbar-right {
-            display: flex;
-            align-items: center;
-            gap: 24px;
-        }
-        
-        .navbar-user {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }
-        
-        .navbar-user-name {
-            font-size: 14px;
-            font-weight: 600;
-            color: var(--text-primary);
-        }
-        
-        .logout-btn {
-            padding: 8px 16px;
-            background: var(--bg-main);
-            border: 1.5px solid var(--border);
-            border-radius: 8px;
-            color: var(--text-secondary);
-            text-decoration: none;
-            font-size: 14px;
-            font-weight: 500;
-            transition: all 0.2s ease;
-        }
-        
-        .logout-btn:hover {
-            background: white;
-            color: var(--text-primary);
-            border-color: var(--text-secondary);
-        }
-        
-        .container {
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 32px;
-        }
-        
-        .page-header {
-            margin-bottom: 32px;
-        }
-        
-        .page-title {
-            font-size: 32px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 8px;
-            letter-spacing: -0.5px;
-        }
-        
-        .page-subtitle {
-            font-size: 16px;
-            color: var(--text-secondary);
-        }
-        
-        .entreprises-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(350px, 1fr));
-            gap: 24px;
-        }
-        
-        .entreprise-card {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 28px;
-            border: 1px solid var(--border);
-            box-shadow: var(--shadow-sm);
-            transition: all 0.3s ease;
-        }
-        
-        .entreprise-card:hover {
-            transform: translateY(-4px);
-            box-shadow: var(--shadow-lg);
-            border-color: var(--primary-light);
-        }
-        
-        .entreprise-header {
-            display: flex;
-            align-items: center;
-            gap: 16px;
-            margin-bottom: 20px;
-        }
-        
-        .entreprise-icon {
-            width: 56px;
-            height: 56px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-light) 100%);
-            border-radius: 14px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 24px;
-            font-weight: 700;
-            color: white;
-            flex-shrink: 0;
-        }
-        
-        .entreprise-info {
-            flex: 1;
-        }
-        
-        .entreprise-name {
-            font-size: 20px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 4px;
-        }
-        
-        .entreprise-id {
-            font-size: 13px;
-            color: var(--text-secondary);
-            font-weight: 500;
-        }
-        
-        .entreprise-stats {
-            display: grid;
-            grid-template-columns: repeat(2, 1fr);
-            gap: 12px;
-            margin-bottom: 20px;
-        }
-        
-        .stat-item {
-            padding: 12px;
-            background: var(--bg-main);
-            border-radius: 10px;
-        }
-        
-        .stat-label {
-            font-size: 12px;
-            color: var(--text-secondary);
-            font-weight: 500;
-            margin-bottom: 4px;
-        }
-        
-        .stat-value {
-            font-size: 18px;
-            font-weight: 700;
-            color: var(--text-primary);
-        }
-        
-        .btn-access {
-            width: 100%;
-            padding: 12px 20px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-size: 15px;
-            font-weight: 600;
-            cursor: pointer;
-            text-decoration: none;
-            display: inline-block;
-            text-align: center;
-            transition: all 0.3s ease;
-            box-shadow: var(--shadow-sm);
-        }
-        
-        .btn-access:hover {
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-md);
-        }
-        
-        .empty-state {
-            background: var(--bg-card);
-            border-radius: 16px;
-            padding: 64px 32px;
-            text-align: center;
-            border: 1px solid var(--border);
-        }
-        
-        .empty-icon {
-            width: 80px;
-            height: 80px;
-            background: var(--bg-main);
-            border-radius: 20px;
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            margin-bottom: 24px;
-        }
-        
-        .empty-icon svg {
-            width: 40px;
-            height: 40px;
-            stroke: var(--text-secondary);
-            stroke-width: 2;
-            fill: none;
-        }
-        
-        .empty-title {
-            font-size: 24px;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 8px;
-        }
-        
-        .empty-text {
-            font-size: 16px;
-            color: var(--text-secondary);
-        }
-        
-        @media (max-width: 768px) {
-            .container {
-                padding: 20px;
-            }
-            
-            .navbar {
-                padding: 12px 20px;
-            }
-            
-            .entreprises-grid {
-                grid-template-columns: 1fr;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/common.css') }}">
+    <link rel="stylesheet" href="{{ asset_url('css/admin_entreprises.css') }}">
 </head>
 <body>
     <nav class="navbar">
@@ -2363,9 +3021,11 @@ ADMIN_ENTREPRISES_TEMPLATE = '''
             <p class="page-subtitle">Accédez aux tableaux de bord des entreprises</p>
         </div>
         
-        {% if entreprises %}
+        {# entreprises est un générateur : for ... else plutôt qu'un test préalable #}
+        {% for entreprise in entreprises %}
+        {% if loop.first %}
         <div class="entreprises-grid">
-            {% for entreprise in entreprises %}
+        {% endif %}
             <div class="entreprise-card">
                 <div class="entreprise-header">
                     <div class="entreprise-icon">{{ entreprise.nom[0]|upper }}</div>
@@ -2383,14 +3043,19 @@ ADMIN_ENTREPRISES_TEMPLATE = '''
                         <div class="stat-label">Créée le</div>
                         <div class="stat-value">{{ entreprise.created_at[:10] }}</div>
                     </div>
+                    <div class="stat-item wide">
+                        <div class="stat-label">Valeur du stock</div>
+                        <div class="stat-value">{{ "%.2f"|format(entreprise.total_value) }} €</div>
+                    </div>
                 </div>
                 
                 <a href="/admin/entreprise/{{ entreprise.id }}" class="btn-access">
                     Accéder au dashboard
                 </a>
             </div>
-            {% endfor %}
+        {% if loop.last %}
         </div>
+        {% endif %}
         {% else %}
         <div class="empty-state">
             <div class="empty-icon">
@@ -2401,19 +3066,369 @@ ADMIN_ENTREPRISES_TEMPLATE = '''
             <h2 class="empty-title">Aucune entreprise</h2>
             <p class="empty-text">Il n'y a pas encore d'entreprise enregistrée</p>
         </div>
-        {% endif %}
+        {% endfor %}
     </div>
 </body>
 </html>
 '''
 
+# ---------- Assets statiques ----------
+
+# Empreintes des fichiers de static/ : l'URL change quand le contenu change,
+# ce qui permet au navigateur de les garder en cache indéfiniment
+_asset_versions = {}
+
+
+@app.template_global()
+def asset_url(filename):
+    """URL d'un fichier de static/ avec son empreinte de contenu (?v=...)."""
+    version = _asset_versions.get(filename)
+    if version is None:
+        with open(os.path.join(app.static_folder, filename), 'rb') as f:
+            version = _asset_versions[filename] = hashlib.sha256(f.read()).hexdigest()[:12]
+    # Équivalent de url_for('static', ...) sans le coût du routage, appelé à chaque rendu
+    return f'{request.script_root}{app.static_url_path}/{filename}?v={version}'
+
+
+@app.after_request
+def cache_static_assets(response):
+    if request.endpoint == 'static' and 'v' in request.args and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+
+# Variantes précompressées des fichiers de static/ (`flask --app app compress-static`),
+# servies telles quelles à la place d'une compression à chaque requête
+STATIC_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+
+@app.before_request
+def precompressed_static():
+    if request.endpoint != 'static':
+        return None
+    path = safe_join(app.static_folder, request.view_args['filename'])
+    if path is None or not os.path.isfile(path):
+        return None
+    for encoding, suffix in STATIC_VARIANTS:
+        variant = path + suffix
+        if (request.accept_encodings[encoding] and os.path.isfile(variant)
+                and os.path.getmtime(variant) >= os.path.getmtime(path)):
+            response = send_file(variant, mimetype=mimetypes.guess_type(path)[0], conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+    return None
+
+
+@app.cli.command('compress-static')
+def compress_static_command():
+    """Écrit les variantes .gz (et .br) des fichiers texte de static/."""
+    written = 0
+    for root, _, files in os.walk(app.static_folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            if filename.endswith(('.gz', '.br')) or not is_compressible(mimetypes.guess_type(path)[0]):
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            variants = {'.gz': lambda: zlib_gzip(data, 9)}
+            if brotli is not None:
+                variants['.br'] = lambda: brotli.compress(data, quality=11)
+            for suffix, compress in variants.items():
+                if os.path.exists(path + suffix) and os.path.getmtime(path + suffix) >= os.path.getmtime(path):
+                    continue
+                with open(path + suffix, 'wb') as f:
+                    f.write(compress())
+                written += 1
+    click.echo(f'{written} variante(s) écrite(s)')
+
+
+# ---------- Compression des réponses ----------
+
+def is_compressible(content_type):
+    return bool(content_type) and content_type.split(';')[0].strip() in COMPRESSIBLE_TYPES
+
+
+def zlib_gzip(data, level=COMPRESSION_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """Couche WSGI de compression des réponses (gzip, ou brotli si le client
+    l'accepte et que le module est installé).
+
+    - seuls les 200 de type COMPRESSIBLE_TYPES d'au moins `min_size` octets
+      sont compressés ; les réponses déjà encodées (variantes précompressées
+      de static/) passent telles quelles ;
+    - une réponse de taille connue est compressée d'un bloc ; une réponse en
+      flux (sans Content-Length) est compressée au fil de l'eau et vidée vers
+      le client tous les COMPRESSION_FLUSH_SIZE octets, pour ne pas retarder
+      l'affichage sans dégrader le taux de compression.
+
+    Les octets avant / après compression sont comptés par route (`metrics()`).
+    """
+
+    def __init__(self, wsgi_app, min_size=COMPRESSION_MIN_SIZE, level=COMPRESSION_LEVEL):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.level = level
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _encoding(self, environ):
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        if brotli is not None and accepted.quality('br'):
+            return 'br'
+        if accepted.quality('gzip'):
+            return 'gzip'
+        return None
+
+    def _compressor(self, encoding):
+        """(compresser un morceau, vider le tampon, terminer le flux)"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    def _count(self, route, bytes_in, bytes_out, responses=1):
+        with self._lock:
+            metrics = self._metrics.setdefault(route, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+            metrics['responses'] += responses
+            metrics['bytes_in'] += bytes_in
+            metrics['bytes_out'] += bytes_out
+
+    def metrics(self):
+        with self._lock:
+            return {route: dict(metrics) for route, metrics in self._metrics.items()}
+
+    def __call__(self, environ, start_response):
+        captured = []
+        # Ancien callable write() : ses octets précèdent le corps et sont compressés avec lui
+        written = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            return written.append
+
+        body = self.wsgi_app(environ, capture)
+        chunks = iter(body)
+        # Une application générateur n'appelle start_response qu'au premier morceau
+        first = [] if captured else list(itertools.islice(chunks, 1))
+        if written or first:
+            body = ClosingIterator(itertools.chain(written, first, chunks), getattr(body, 'close', None))
+        status, headers, exc_info = captured
+        route = environ.get('marketplace.endpoint') or 'autre'
+        header_map = {name.lower(): value for name, value in headers}
+        content_type = header_map.get('content-type')
+        length = header_map.get('content-length')
+
+        compressible = is_compressible(content_type) and 'content-encoding' not in header_map
+        if compressible:
+            headers = [*headers, ('Vary', 'Accept-Encoding')]
+        encoding = self._encoding(environ)
+        if (not compressible or encoding is None or not status.startswith('200')
+                or environ.get('REQUEST_METHOD') == 'HEAD'
+                or 'no-transform' in header_map.get('cache-control', '')
+                or (length is not None and int(length) < self.min_size)):
+            start_response(status, headers, exc_info)
+            if length is not None:
+                self._count(route, int(length), int(length))
+            return body
+
+        headers = [(name, value) for name, value in headers if name.lower() not in ('content-length', 'etag')]
+        headers.append(('Content-Encoding', encoding))
+        # Une représentation compressée n'est plus identique à l'octet près : ETag faible
+        etag = header_map.get('etag')
+        if etag:
+            headers.append(('ETag', etag if etag.startswith('W/') else f'W/{etag}'))
+
+        if length is not None:
+            try:
+                data = b''.join(body)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+            compressed = zlib_gzip(data, self.level) if encoding == 'gzip' else brotli.compress(data, quality=BROTLI_QUALITY)
+            start_response(status, [*headers, ('Content-Length', str(len(compressed)))], exc_info)
+            self._count(route, len(data), len(compressed))
+            return [compressed]
+        # close() doit atteindre `body` même si le flux n'a jamais été parcouru
+        return ClosingIterator(self._stream(body, status, headers, exc_info, start_response, encoding,
+                                            route, header_map), getattr(body, 'close', None))
+
+    def _stream(self, body, status, headers, exc_info, start_response, encoding, route, header_map):
+        """Compresse une réponse en flux ; en dessous de min_size, elle part telle quelle."""
+        bytes_in = bytes_out = 0
+        try:
+            chunks = iter(body)
+            # Début de la réponse mis de côté jusqu'à savoir s'il vaut la peine de compresser
+            pending = []
+            for chunk in chunks:
+                pending.append(chunk)
+                bytes_in += len(chunk)
+                if bytes_in >= self.min_size:
+                    break
+            else:
+                original = [(name, value) for name, value in headers if name.lower() != 'content-encoding']
+                if 'etag' in header_map:
+                    original = [(name, value) for name, value in original if name.lower() != 'etag']
+                    original.append(('ETag', header_map['etag']))
+                start_response(status, original, exc_info)
+                data = b''.join(pending)
+                bytes_out = len(data)
+                yield data
+                return
+
+            start_response(status, headers, exc_info)
+            compress, flush, finish = self._compressor(encoding)
+            data = compress(b''.join(pending)) + flush()
+            bytes_out += len(data)
+            yield data
+            unflushed = 0
+            for chunk in chunks:
+                bytes_in += len(chunk)
+                unflushed += len(chunk)
+                data = compress(chunk)
+                if unflushed >= COMPRESSION_FLUSH_SIZE:
+                    data += flush()
+                    unflushed = 0
+                if data:
+                    bytes_out += len(data)
+                    yield data
+            data = finish()
+            bytes_out += len(data)
+            yield data
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            self._count(route, bytes_in, bytes_out)
+
+
+@app.after_request
+def record_endpoint(response):
+    # Nom de la route pour les mesures de CompressionMiddleware
+    request.environ['marketplace.endpoint'] = request.endpoint
+    return response
+
+
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+app.wsgi_app = CompressionMiddleware(app.wsgi_app)
+
+
+# ---------- Registre des templates ----------
+
+# Les templates sont servis par un DictLoader : Jinja les compile une seule
+# fois et garde le résultat en cache, au lieu de re-parser la source à chaque
+# requête comme render_template_string.
+TEMPLATES = {
+    'auth.html': AUTH_TEMPLATE,
+    'dashboard.html': DASHBOARD_TEMPLATE,
+    'product_list.html': PRODUCT_LIST_TEMPLATE,
+    'product_card.html': PRODUCT_CARD_TEMPLATE,
+    'product_form.html': PRODUCT_FORM_TEMPLATE,
+    'admin_entreprises.html': ADMIN_ENTREPRISES_TEMPLATE,
+}
+app.jinja_loader = DictLoader(TEMPLATES)
+
+# Compilation au démarrage plutôt qu'à la première requête
+for template_name in TEMPLATES:
+    app.jinja_env.get_template(template_name)
+
+
+def buffered(chunks, size=STREAM_BUFFER_SIZE):
+    """Regroupe les petits morceaux produits par Jinja en blocs d'environ `size` caractères."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_page(template_name, **context):
+    """Réponse rendue au fil de l'eau : l'en-tête de page et les premières lignes
+    partent avant que le reste ne soit rendu, et la page complète n'est jamais
+    en mémoire (le contexte de requête reste disponible pendant le rendu)."""
+    return app.response_class(buffered(stream_template(template_name, **context)), mimetype='text/html')
+
+
+# ---------- Pages conditionnelles (ETag) ----------
+
+# Ce qui, dans la session, change le contenu des pages
+PAGE_SESSION_KEYS = ('user_id', 'user_nom', 'user_role', 'id_entreprise', 'nom_entreprise',
+                     'admin_viewing_entreprise', 'admin_viewing_entreprise_nom')
+
+
+def _pages_version():
+    """Empreinte des templates et de static/ : un déploiement change tous les ETags."""
+    digest = hashlib.sha256()
+    for name in sorted(TEMPLATES):
+        digest.update(TEMPLATES[name].encode())
+    for root, dirs, files in os.walk(app.static_folder):
+        dirs.sort()
+        for filename in sorted(files):
+            with open(os.path.join(root, filename), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+PAGES_VERSION = _pages_version()
+
+
+def page_etag(id_entreprise):
+    """ETag d'une page construite à partir des produits d'une entreprise.
+
+    Combine la version de ses produits (stat des fichiers ou une requête
+    indexée, sans lire le catalogue), la session, l'URL et PAGES_VERSION.
+    La version doit être la même dans tous les workers pour un même état :
+    sinon l'un d'eux répondrait 304 à un ETag périmé.
+    """
+    identity = tuple(session.get(key) for key in PAGE_SESSION_KEYS)
+    data = repr((storage.get_products_version(id_entreprise), identity, request.full_path, PAGES_VERSION))
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def conditional_page(response, etag):
+    """Ajoute l'ETag : le navigateur revalide la page à chaque visite (no-cache)."""
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag):
+    """Réponse 304 si le navigateur a déjà cette version de la page (If-None-Match), sinon None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return conditional_page(app.response_class(status=304), etag)
+
+
 # ---------- Routes Auth / Index ----------
 
 @app.route('/')
 def index():
     if 'user_id' in session:
         return redirect(url_for('dashboard'))
-    return render_template_string(AUTH_TEMPLATE, login_error=None, register_error=None, success=None)
+    return render_template('auth.html', login_error=None, register_error=None, success=None)
+
+
+def password_pool_busy(form):
+    """Réponse 503 quand le pool de hachage est saturé."""
+    errors = {'login_error': None, 'register_error': None}
+    errors[f'{form}_error'] = 'Serveur occupé, veuillez réessayer dans quelques secondes'
+    return render_template('auth.html', success=None, **errors), 503, {'Retry-After': '2'}
 
 
 @app.route('/login', methods=['POST'])
@@ -2421,8 +3436,32 @@ def login():
     email = request.form['email']
     password = request.form['password']
 
+    retry_after = login_retry_after(request.remote_addr, email)
+    if retry_after:
+        return render_template(
+            'auth.html',
+            login_error=f'Trop de tentatives, réessayez dans {math.ceil(retry_after)} secondes',
+            register_error=None,
+            success=None
+        ), 429, {'Retry-After': str(math.ceil(retry_after))}
+
     user = get_user_by_email(email)
-    if user and check_password(password, user['mdp']):
+    try:
+        valid = user is not None and check_password(password, user['mdp'])
+    except PasswordPoolBusy:
+        return password_pool_busy('login')
+
+    if valid:
+        login_account_throttle.success(email)
+
+        # Hash d'un coût différent de la politique actuelle : on le refait
+        # maintenant que le mot de passe en clair est connu
+        if password_policy.needs_rehash(user['mdp']):
+            try:
+                update_user_password(user['id'], hash_password(password))
+            except PasswordPoolBusy:
+                pass  # nouvel essai à la prochaine connexion
+
         if 'id_entreprise' in user and user['id_entreprise']:
             entreprise = get_entreprise_by_id(user['id_entreprise'])
             session['id_entreprise'] = user['id_entreprise']
@@ -2449,8 +3488,10 @@ def login():
         else:
             return redirect(url_for('dashboard'))
     else:
-        return render_template_string(
-            AUTH_TEMPLATE,
+        login_ip_throttle.failure(request.remote_addr)
+        login_account_throttle.failure(email)
+        return render_template(
+            'auth.html',
             login_error='Email ou mot de passe incorrect',
             register_error=None,
             success=None
@@ -2466,32 +3507,43 @@ def register():
     nom_entreprise = request.form['nom_entreprise']
 
     if password != confirm_password:
-        return render_template_string(
-            AUTH_TEMPLATE,
+        return render_template(
+            'auth.html',
             register_error='Les mots de passe ne correspondent pas',
             login_error=None,
             success=None
         )
 
     if len(password) < 8:
-        return render_template_string(
-            AUTH_TEMPLATE,
+        return render_template(
+            'auth.html',
             register_error='Le mot de passe doit contenir au moins 8 caractères',
             login_error=None,
             success=None
         )
 
+    if password in pwned_passwords:
+        return render_template(
+            'auth.html',
+            register_error='Ce mot de passe apparaît dans une fuite de données connue, choisissez-en un autre',
+            login_error=None,
+            success=None
+        )
+
     if get_user_by_email(email):
-        return render_template_string(
-            AUTH_TEMPLATE,
+        return render_template(
+            'auth.html',
             register_error='Cet email est déjà utilisé',
             login_error=None,
             success=None
         )
 
-    create_user(nom, email, password, nom_entreprise)
-    return render_template_string(
-        AUTH_TEMPLATE,
+    try:
+        create_user(nom, email, password, nom_entreprise)
+    except PasswordPoolBusy:
+        return password_pool_busy('register')
+    return render_template(
+        'auth.html',
         success='Inscription réussie ! Vous pouvez maintenant vous connecter.',
         login_error=None,
         register_error=None
@@ -2522,22 +3574,37 @@ def dashboard():
         'id_entreprise': session['id_entreprise']
     }
 
-    products = get_products_by_entreprise(user['id_entreprise'])
+    etag = page_etag(user['id_entreprise'])
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
 
-    total_quantity = sum(int(p['quantite']) for p in products) if products else 0
-    total_value = sum(float(p['prix']) * int(p['quantite']) for p in products) if products else 0
+    stats = get_entreprise_stats(user['id_entreprise'])
 
-    return render_template_string(
-        DASHBOARD_TEMPLATE,
-        user=user,
-        products=products,
-        total_quantity=total_quantity,
-        total_value=total_value
-    )
+    return conditional_page(stream_page('dashboard.html', user=user, **stats), etag)
 
 
 # ---------- Produits : liste / CRUD / recherche / pagination ----------
 
+# Tris proposés sur la liste (clés de PRODUCT_SORT_KEYS) ; par défaut, ordre d'ajout
+PRODUCT_LIST_SORTS = {'nom': 'Nom', 'prix': 'Prix', 'quantite': 'Quantité'}
+PRODUCT_LIST_FILTERS = ('q', 'sort', 'prix_min', 'prix_max', 'stock_max')
+# Liens de pagination : première et dernière page, et PAGE_LINKS_RADIUS pages
+# de part et d'autre de la page courante
+PAGE_LINKS_RADIUS = 2
+
+
+def page_links(page, total_pages, radius=PAGE_LINKS_RADIUS):
+    """Numéros de page à afficher, None pour une ellipse : [1, None, 4, 5, 6, 7, 8, None, 40]."""
+    pages = sorted({1, total_pages, *range(max(page - radius, 1), min(page + radius, total_pages) + 1)})
+    links = []
+    for p in pages:
+        if links and p - links[-1] > 1:
+            links.append(None)
+        links.append(p)
+    return links
+
+
 @app.route('/products')
 def product_list():
     if 'user_id' not in session:
@@ -2557,28 +3624,65 @@ def product_list():
         'id_entreprise': entreprise_id
     }
 
-    all_products = get_products_by_entreprise(entreprise_id)
+    etag = page_etag(entreprise_id)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
 
     q = request.args.get('q', '').strip()
-    if q:
-        all_products = [p for p in all_products if q.lower() in p['nom'].lower()]
-
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     per_page = 10
-    total = len(all_products)
-    total_pages = max((total - 1) // per_page + 1, 1)
     start = (page - 1) * per_page
-    end = start + per_page
-    products_page = all_products[start:end]
+    # Lien « Suivant » : curseur sur le dernier produit de la page précédente
+    after = request.args.get('after') or None
+    sort = request.args.get('sort', '')
+    if sort not in PRODUCT_LIST_SORTS:
+        sort = ''
+    ranges = {
+        'prix': (request.args.get('prix_min', type=parse_price), request.args.get('prix_max', type=parse_price)),
+        'quantite': (None, request.args.get('stock_max', type=int)),
+    }
+    # Paramètres à reporter dans les liens de pagination
+    filters = {name: request.args[name] for name in PRODUCT_LIST_FILTERS if request.args.get(name)}
+
+    fuzzy = False
+    if q:
+        total, products_page = search_products(entreprise_id, q, start, per_page, sort or None, ranges, after)
+        if not total:
+            total, products_page = fuzzy_search_products(entreprise_id, q, start, per_page, ranges, after)
+            fuzzy = total > 0
+    else:
+        total, products_page = list_products(entreprise_id, sort or 'id', ranges, start, per_page, after)
+    total_pages = max((total - 1) // per_page + 1, 1)
 
-    return render_template_string(
-        PRODUCT_LIST_TEMPLATE,
+    return conditional_page(stream_page(
+        'product_list.html',
         user=user,
         products=products_page,
+        cards=product_cards.render(products_page),
         page=page,
         total_pages=total_pages,
-        q=q
-    )
+        page_links=page_links(page, total_pages),
+        q=q,
+        fuzzy=fuzzy,
+        sort=sort,
+        sorts=PRODUCT_LIST_SORTS,
+        filters=filters
+    ), etag)
+
+
+@app.route('/products/suggest')
+def product_suggest():
+    if 'user_id' not in session:
+        abort(401)
+
+    if session.get('user_role') == 'admin' and 'admin_viewing_entreprise' in session:
+        entreprise_id = session['admin_viewing_entreprise']
+    else:
+        entreprise_id = session['id_entreprise']
+
+    q = request.args.get('q', '').strip()
+    return jsonify([{'id': p.id, 'nom': p.nom} for p in suggest_products(entreprise_id, q)])
 
 
 @app.route('/products/add', methods=['GET', 'POST'])
@@ -2607,10 +3711,14 @@ def product_add():
         quantite = request.form['quantite']
         image_url = request.form.get('image_url', '')
 
-        add_product(nom, description, prix, quantite, entreprise_id, image_url)
+        try:
+            add_product(nom, description, prix, quantite, entreprise_id, image_url)
+        except ValueError as e:
+            # Formulaire réaffiché avec les valeurs saisies
+            return render_template('product_form.html', user=user, product=None, form=request.form, error=str(e))
         return redirect(url_for('product_list'))
 
-    return render_template_string(PRODUCT_FORM_TEMPLATE, user=user, product=None)
+    return render_template('product_form.html', user=user, product=None, form={}, error=None)
 
 
 @app.route('/products/<int:product_id>/edit', methods=['GET', 'POST'])
@@ -2644,10 +3752,13 @@ def product_edit(product_id):
         quantite = request.form['quantite']
         image_url = request.form.get('image_url', '')
 
-        update_product(product_id, entreprise_id, nom, description, prix, quantite, image_url)
+        try:
+            update_product(product_id, entreprise_id, nom, description, prix, quantite, image_url)
+        except ValueError as e:
+            return render_template('product_form.html', user=user, product=product, form=request.form, error=str(e))
         return redirect(url_for('product_list'))
 
-    return render_template_string(PRODUCT_FORM_TEMPLATE, user=user, product=product)
+    return render_template('product_form.html', user=user, product=product, form={}, error=None)
 
 
 @app.route('/products/<int:product_id>/delete', methods=['POST'])
@@ -2664,6 +3775,34 @@ def product_delete(product_id):
     delete_product(product_id, entreprise_id)
     return redirect(url_for('product_list'))
 
+# ---------- Images ----------
+
+@app.route('/images/<name>')
+def product_image(name):
+    if 'user_id' not in session:
+        return redirect(url_for('index'))
+
+    match = IMAGE_NAME_RE.fullmatch(name)
+    if not match:
+        abort(404)
+    path = image_blob_path(name)
+    if not os.path.exists(path):
+        abort(404)
+
+    # Contenu adressé par hash : le hash sert d'ETag fort et le fichier ne change jamais
+    response = send_file(
+        os.path.abspath(path),
+        mimetype=f"image/{'jpeg' if match['ext'] == 'jpg' else match['ext']}",
+        etag=match['hash'],
+        max_age=31536000,
+        conditional=True
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+
 # ---------- Routes Admin ----------
 
 @app.route('/admin/entreprises')
@@ -2677,15 +3816,18 @@ def admin_entreprises():
         'role': session['user_role']
     }
     
-    entreprises = get_all_entreprises()
-    
-    # Ajouter le nombre de produits pour chaque entreprise
-    for entreprise in entreprises:
-        products = get_products_by_entreprise(entreprise['id'])
-        entreprise['nb_products'] = len(products)
+    # Ajouter le nombre de produits et la valeur du stock pour chaque entreprise
+    # (agrégats maintenus, récupérés en une seule fois) ; les entreprises sont
+    # lues au fil du rendu de la page
+    all_stats = get_all_entreprise_stats()
+    empty_stats = format_stats(0, 0, 0)
+    entreprises = (
+        {**entreprise, **all_stats.get(str(entreprise['id']), empty_stats)}
+        for entreprise in iter_entreprises()
+    )
     
-    return render_template_string(
-        ADMIN_ENTREPRISES_TEMPLATE,
+    return stream_page(
+        'admin_entreprises.html',
         user=user,
         entreprises=entreprises
     )
@@ -2704,6 +3846,11 @@ def admin_view_entreprise(entreprise_id):
     session['admin_viewing_entreprise'] = entreprise_id
     session['admin_viewing_entreprise_nom'] = entreprise['nom']
     
+    etag = page_etag(entreprise_id)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
     user = {
         'id': session['user_id'],
         'nom': session['user_nom'],
@@ -2712,27 +3859,38 @@ def admin_view_entreprise(entreprise_id):
         'role': 'admin'
     }
     
-    products = get_products_by_entreprise(entreprise_id)
-    total_quantity = sum(int(p['quantite']) for p in products) if products else 0
-    total_value = sum(float(p['prix']) * int(p['quantite']) for p in products) if products else 0
+    stats = get_entreprise_stats(entreprise_id)
     
-    return render_template_string(
-        DASHBOARD_TEMPLATE,
-        user=user,
-        products=products,
-        total_quantity=total_quantity,
-        total_value=total_value
-    )
+    return conditional_page(stream_page('dashboard.html', user=user, **stats), etag)
+
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    if 'user_id' not in session or session.get('user_role') != 'admin':
+        return redirect(url_for('index'))
+    return jsonify({
+        'password_pool': password_pool.metrics(),
+        'password_policy': {'budget_ms': password_policy.budget_ms, 'rounds': password_policy.rounds},
+        'login_throttle': login_throttle_metrics(),
+        'compression': app.wsgi_app.metrics(),
+        'product_cards': product_cards.metrics(),
+    })
 
 # ---------- Lancement Webview / dev ----------
 
+def init_app():
+    """Crée les fichiers manquants et calibre bcrypt au démarrage plutôt qu'au premier login."""
+    storage.init()
+    password_policy.rounds
+
+
 def start_app():
-    init_csv_files()
+    init_app()
     window = webview.create_window('Gestion de Produits', app, width=1200, height=800)
     webview.start()
 
 
 if __name__ == '__main__':
-    init_csv_files()
+    init_app()
     app.run(debug=False)
     start_app()
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""Benchmark : comptage des produits de toutes les entreprises (page admin).
+
+Compare, pour 10k entreprises de 10 produits :
+- l'ancien N+1 : un parcours complet de products.csv par entreprise
+  (mesuré sur un échantillon puis extrapolé) ;
+- un N+1 sur l'index par entreprise de ProductStore ;
+- les agrégats maintenus, récupérés en un seul appel.
+
+    python benchmarks/bench_admin_entreprises.py [nb_entreprises]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import PRODUCT_FIELDS, IdAllocator, ProductStore  # noqa: E402
+
+PRODUCTS_PER_ENTREPRISE = 10
+LEGACY_SAMPLE = 5
+
+
+def generate_catalog(path, nb_entreprises):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_FIELDS)
+        for i in range(1, nb_entreprises * PRODUCTS_PER_ENTREPRISE + 1):
+            writer.writerow([i, f'Produit {i}', '', '9.99', 10, (i - 1) // PRODUCTS_PER_ENTREPRISE + 1, ''])
+
+
+def legacy_count(path, id_entreprise):
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(1 for row in csv.DictReader(f) if row['id_entreprise'] == str(id_entreprise))
+
+
+def main(nb_entreprises):
+    entreprise_ids = [str(i) for i in range(1, nb_entreprises + 1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'products.csv')
+        generate_catalog(path, nb_entreprises)
+        store = ProductStore(path, os.path.join(tmp, 'products_log.csv'),
+                             IdAllocator(os.path.join(tmp, 'sequences.csv')))
+        store.all_stats()
+
+        start = time.perf_counter()
+        for id_entreprise in entreprise_ids[:LEGACY_SAMPLE]:
+            legacy_count(path, id_entreprise)
+        legacy = (time.perf_counter() - start) / LEGACY_SAMPLE * nb_entreprises
+
+        start = time.perf_counter()
+        counts = {id_entreprise: len(store.by_entreprise(id_entreprise)) for id_entreprise in entreprise_ids}
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = store.all_stats()
+        summary = {id_entreprise: stats[id_entreprise]['nb_products'] for id_entreprise in entreprise_ids}
+        maintained = time.perf_counter() - start
+        assert summary == counts
+
+    print(f'{nb_entreprises} entreprises, {nb_entreprises * PRODUCTS_PER_ENTREPRISE} produits')
+    print(f'N+1 sur le CSV (extrapolé) : {legacy:10.2f} s')
+    print(f'N+1 sur ProductStore       : {indexed * 1e3:10.2f} ms')
+    print(f'Agrégats maintenus         : {maintained * 1e3:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
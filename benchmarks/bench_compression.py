@@ -0,0 +1,78 @@
+"""Benchmark : octets transmis par route avec CompressionMiddleware.
+
+Pour chaque route, taille de la réponse sans compression (identity), en gzip
+et en brotli (si le module est installé), avec le temps moyen de la requête.
+Les données de data/ et static/ sont copiées dans un dossier temporaire.
+
+    python benchmarks/bench_compression.py [nb_produits]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import app as marketplace  # noqa: E402
+
+# (rôle de la session, route)
+ROUTES = [
+    ('user', '/dashboard'),
+    ('user', '/products'),
+    ('user', '/products?q=produit&page=2'),
+    ('user', '/products/suggest?q=prod'),
+    ('admin', '/admin/entreprises'),
+    ('user', '/static/css/common.css'),
+    ('user', '/static/css/product_list.css'),
+]
+ENCODINGS = ['identity', 'gzip'] + (['br'] if marketplace.brotli is not None else [])
+REPEAT = 20
+
+
+def measure(client, route, encoding):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        # Corps lu à chaque fois : les pages rendues en flux ne sont produites qu'à la lecture
+        size = len(client.get(route, headers={'Accept-Encoding': encoding}).data)
+    elapsed = (time.perf_counter() - start) / REPEAT
+    return size, elapsed
+
+
+def main(nb_products):
+    tmp = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(ROOT, 'data'), os.path.join(tmp, 'data'))
+        os.chdir(tmp)
+        marketplace.init_csv_files()
+        for i in range(nb_products):
+            marketplace.add_product(f'Produit {i}', f'Description du produit {i}', '9.99', '10', 1)
+
+        client = marketplace.app.test_client()
+
+        print(f'{nb_products} produits ajoutés, seuil {marketplace.COMPRESSION_MIN_SIZE} octets\n')
+        header = ''.join(f'{encoding + " (o)":>16}{"ms":>8}' for encoding in ENCODINGS)
+        print(f'{"route":<32}{header}')
+        for role, route in ROUTES:
+            with client.session_transaction() as session:
+                session.clear()
+                session.update(user_id='1', user_nom='Lundi', user_role=role,
+                               id_entreprise='1', nom_entreprise='Lundi')
+            line = f'{route:<32}'
+            for encoding in ENCODINGS:
+                size, elapsed = measure(client, route, encoding)
+                line += f'{size:>16}{elapsed * 1e3:>8.2f}'
+            print(line)
+
+        print('\nmesures du middleware (octets avant -> après, tous encodages confondus)')
+        for route, metrics in sorted(marketplace.app.wsgi_app.metrics().items()):
+            ratio = metrics['bytes_out'] / metrics['bytes_in'] if metrics['bytes_in'] else 1
+            print(f'{route:<32}{metrics["bytes_in"]:>12} -> {metrics["bytes_out"]:>10}  ({ratio:.0%})')
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
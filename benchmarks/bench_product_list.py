@@ -0,0 +1,103 @@
+"""Benchmark : page de la liste produits triée / filtrée pour une entreprise de 100k produits.
+
+Compare, par requête :
+- l'ancienne approche : copie de tous les produits de l'entreprise (lignes
+  CSV en texte, reconverties à chaque requête), filtre, tri et découpage de
+  la page ;
+- les index secondaires triés de CatalogIndex (bisect + tranche) ;
+- pour des pages profondes, l'accès par numéro de page (offset) et par
+  curseur `after` (id du dernier produit de la page précédente), avec un
+  filtre qui oblige à parcourir l'index au lieu d'en prendre une tranche.
+
+    python benchmarks/bench_product_list.py [nb_produits]
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import CatalogIndex, Product, normalize_text  # noqa: E402
+
+PER_PAGE = 10
+REPEAT = 20
+# (libellé, tri, filtres, page)
+QUERIES = [
+    ('ordre d\'ajout', 'id', {}, 1),
+    ('nom, page 500', 'nom', {}, 500),
+    ('prix 10-20 €', 'prix', {'prix': (Decimal(10), Decimal(20))}, 1),
+    ('stock <= 5 par nom', 'nom', {'quantite': (None, 5)}, 1),
+    ('prix >= 90 €, stock <= 5', 'quantite', {'prix': (Decimal(90), None), 'quantite': (None, 5)}, 1),
+]
+# Clés de tri de l'ancienne approche, sur les lignes CSV
+LEGACY_SORT_KEYS = {
+    'id': lambda row: int(row['id']),
+    'nom': lambda row: normalize_text(row['nom']),
+    'prix': lambda row: Decimal(row['prix']),
+    'quantite': lambda row: int(row['quantite']),
+}
+
+
+def generate_products(nb_products):
+    rng = random.Random(42)
+    for i in range(1, nb_products + 1):
+        yield {
+            'id': str(i),
+            'nom': f'Produit {rng.randint(1, 10 ** 6)}',
+            'description': '',
+            'prix': str(Decimal(rng.randint(100, 10000)) / 100),
+            'quantite': str(rng.randint(0, 100)),
+            'id_entreprise': '1',
+            'image_url': '',
+        }
+
+
+def legacy_page(products, sort, ranges, page):
+    rows = [dict(product) for product in products]
+    for key, (low, high) in ranges.items():
+        value = LEGACY_SORT_KEYS[key]
+        rows = [row for row in rows
+                if (low is None or value(row) >= low) and (high is None or value(row) <= high)]
+    rows.sort(key=lambda row: (LEGACY_SORT_KEYS[sort](row), int(row['id'])))
+    start = (page - 1) * PER_PAGE
+    return len(rows), rows[start:start + PER_PAGE]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn()
+    return result, (time.perf_counter() - start) / REPEAT
+
+
+def main(nb_products):
+    products = list(generate_products(nb_products))
+    index = CatalogIndex(None, [Product.from_row(row) for row in products])
+    print(f'{nb_products} produits, {PER_PAGE} par page\n')
+    print(f'{"requête":<28}{"ancien (ms)":>14}{"index (ms)":>14}{"résultats":>12}')
+    for label, sort, ranges, page in QUERIES:
+        (expected, _), legacy = timed(lambda: legacy_page(products, sort, ranges, page))
+        (total, _), indexed = timed(lambda: index.listing(sort, ranges, (page - 1) * PER_PAGE, PER_PAGE))
+        assert total == expected
+        print(f'{label:<28}{legacy * 1e3:>14.2f}{indexed * 1e3:>14.3f}{total:>12}')
+
+    sort, ranges = 'nom', {'quantite': (None, 80)}
+    total, _ = index.listing(sort, ranges)
+    print(f'\nstock <= 80 par nom ({total} résultats)')
+    print(f'{"page":<28}{"offset (ms)":>14}{"curseur (ms)":>14}')
+    # Dernière page pleine : les pages au-delà n'existent pas avec peu de produits
+    last = max(1, total // PER_PAGE)
+    for page in sorted({page for page in (1, 100, 1000, last) if page <= last}):
+        offset = (page - 1) * PER_PAGE
+        _, previous = index.listing(sort, ranges, offset - PER_PAGE, PER_PAGE) if page > 1 else (0, [])
+        after = previous[-1].id if previous else None
+        (_, by_offset), offset_time = timed(lambda: index.listing(sort, ranges, offset, PER_PAGE))
+        (_, by_cursor), cursor_time = timed(lambda: index.listing(sort, ranges, 0, PER_PAGE, after))
+        assert by_offset == by_cursor
+        print(f'{page:<28}{offset_time * 1e3:>14.3f}{cursor_time * 1e3:>14.3f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
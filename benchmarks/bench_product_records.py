@@ -0,0 +1,78 @@
+"""Benchmark : catalogue en mémoire, lignes dict (csv.DictReader) vs Product.
+
+Pour N produits lus d'un même CSV, compare :
+- la mémoire occupée (tracemalloc) par la liste de dicts texte et par la
+  liste de Product (prix Decimal, quantité int) ;
+- le temps de chargement ;
+- un calcul fait à chaque requête avant Product : valeur du stock, en
+  reconvertissant int(quantite) * Decimal(prix) sur les dicts, contre une
+  simple lecture des champs déjà typés.
+
+    python benchmarks/bench_product_records.py [nb_produits]
+"""
+import csv
+import gc
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import PRODUCT_FIELDS, Product  # noqa: E402
+
+
+def generate_csv(nb_products):
+    rng = random.Random(42)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(PRODUCT_FIELDS)
+    for i in range(1, nb_products + 1):
+        writer.writerow([i, f'Produit {rng.randint(1, 10 ** 6)}', f'Description {i}',
+                         Decimal(rng.randint(100, 10000)) / 100, rng.randint(0, 100),
+                         rng.randint(1, 100), ''])
+    return out.getvalue()
+
+
+def load(data, convert):
+    """(produits, octets alloués, secondes) ; le temps est mesuré sans tracemalloc."""
+    start = time.perf_counter()
+    products = [convert(row) for row in csv.DictReader(io.StringIO(data))]
+    elapsed = time.perf_counter() - start
+    del products
+    gc.collect()
+    tracemalloc.start()
+    products = [convert(row) for row in csv.DictReader(io.StringIO(data))]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return products, size, elapsed
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(nb_products):
+    data = generate_csv(nb_products)
+    print(f'{nb_products} produits\n')
+    print(f'{"lignes":<10}{"mémoire (Mo)":>14}{"octets/produit":>16}{"chargement (s)":>16}{"valeur stock (ms)":>19}')
+
+    rows, size, elapsed = load(data, dict)
+    total, compute = timed(lambda: sum(int(p['quantite']) * Decimal(p['prix']) for p in rows))
+    print(f'{"dict":<10}{size / 2 ** 20:>14.0f}{size / nb_products:>16.0f}{elapsed:>16.2f}{compute * 1e3:>19.0f}')
+    del rows
+
+    records, size, elapsed = load(data, Product.from_row)
+    expected = total
+    total, compute = timed(lambda: sum(p.quantite * p.prix for p in records))
+    assert total == expected
+    print(f'{"Product":<10}{size / 2 ** 20:>14.0f}{size / nb_products:>16.0f}{elapsed:>16.2f}{compute * 1e3:>19.0f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,87 @@
+"""Benchmark : coût par requête de ProductStore vs lecture complète du CSV.
+
+Génère des catalogues de taille croissante (entreprises de 50 produits) et
+mesure le temps moyen de `get_products_by_entreprise` / `get_product_by_id`.
+
+Chaque appel à `by_entreprise` copie les produits de l'entreprise dans une
+nouvelle liste : avec un nombre de produits par entreprise fixe, ce coût ne
+dépend pas de la taille du catalogue. L'essentiel du temps est la vérification
+de fraîcheur (trois os.stat, colonne `stat`). Chaque mesure est la meilleure
+de REPEAT passes de LOOKUPS appels : une seule passe courte varie du simple
+au triple d'une exécution à l'autre.
+
+    python benchmarks/bench_product_store.py [1000 10000 100000 1000000]
+"""
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import PRODUCT_FIELDS, IdAllocator, ProductStore  # noqa: E402
+
+PRODUCTS_PER_ENTREPRISE = 50
+LOOKUPS = 2000
+REPEAT = 5
+LEGACY_MAX_SIZE = 100_000
+
+
+def generate_catalog(path, size):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_FIELDS)
+        for i in range(1, size + 1):
+            writer.writerow([i, f'Produit {i}', 'Description', '9.99', 10,
+                             (i - 1) // PRODUCTS_PER_ENTREPRISE + 1, ''])
+
+
+def legacy_products_by_entreprise(path, id_entreprise):
+    """Ancienne implémentation : parcours complet du fichier."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [row for row in csv.DictReader(f) if row['id_entreprise'] == str(id_entreprise)]
+
+
+def timed(fn, args_list, repeat=REPEAT):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best / len(args_list) * 1e6
+
+
+def main(sizes):
+    print(f"{'produits':>10} {'chargement':>12} {'by_entreprise':>14} {'by_id':>10} {'stat':>10} {'legacy':>12}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'products.csv')
+            generate_catalog(path, size)
+            nb_entreprises = (size - 1) // PRODUCTS_PER_ENTREPRISE + 1
+            entreprises = [(random.randint(1, nb_entreprises),) for _ in range(LOOKUPS)]
+            products = []
+            for _ in range(LOOKUPS):
+                pid = random.randint(1, size)
+                products.append((pid, (pid - 1) // PRODUCTS_PER_ENTREPRISE + 1))
+
+            store = ProductStore(path, os.path.join(tmp, 'products_log.csv'),
+                                 IdAllocator(os.path.join(tmp, 'sequences.csv')))
+            start = time.perf_counter()
+            store.by_entreprise(1)
+            load_ms = (time.perf_counter() - start) * 1e3
+
+            by_ent_us = timed(store.by_entreprise, entreprises)
+            by_id_us = timed(store.get, products)
+            stat_us = timed(lambda e: store._file_stat(), entreprises)
+            if size <= LEGACY_MAX_SIZE:
+                legacy = f'{timed(lambda e: legacy_products_by_entreprise(path, e), entreprises[:10], 1):10.0f}us'
+            else:
+                legacy = '-'
+            print(f'{size:>10} {load_ms:>10.0f}ms {by_ent_us:>12.1f}us {by_id_us:>8.1f}us {stat_us:>8.1f}us {legacy:>12}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000, 1_000_000])
@@ -0,0 +1,91 @@
+"""Benchmark : recherche dans le catalogue d'une entreprise de 100k produits.
+
+Compare, par requête :
+- l'ancien filtre `q in nom` sur tous les produits ;
+- la recherche BM25 par index inversé (page de 10 résultats) ;
+- l'autocomplétion (bisect dans les noms triés) ;
+- la recherche approchée par trigrammes, pour plusieurs valeurs de
+  max_candidates, face à une comparaison exhaustive de tous les noms
+  (top 10 = part de la meilleure similarité exhaustive atteinte par les
+  10 premiers résultats).
+
+    python benchmarks/bench_search.py [nb_produits]
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import CatalogIndex, Product, tokenize, trigram_similarity, trigrams  # noqa: E402
+
+NOMS = ['Téléphone', 'Écran', 'Clavier', 'Souris', 'Câble', 'Chargeur', 'Enceinte', 'Casque',
+        'Imprimante', 'Routeur', 'Disque', 'Batterie', 'Tablette', 'Caméra', 'Micro', 'Adaptateur']
+QUALIFICATIFS = ['portable', 'sans fil', 'USB-C', 'noir', 'blanc', 'pro', 'mini', 'gaming',
+                 'bluetooth', 'HD', '4K', 'ergonomique', 'étanche', 'rapide', 'compact', 'premium']
+REQUETES = ['ecran', 'cable usb', 'casque blue', 'imprimante noir']
+PREFIXES = ['t', 'cam', 'casque g', 'port']
+FAUTES = ['telefone', 'ecrann', 'claver', 'chargeurr', 'imprimente']
+MAX_CANDIDATES = [50, 200, 1000]
+REPEAT = 20
+
+
+def generate_products(nb_products):
+    rng = random.Random(42)
+    for i in range(1, nb_products + 1):
+        nom = f'{rng.choice(NOMS)} {rng.choice(QUALIFICATIFS)} {rng.randint(1, 9999)}'
+        description = ' '.join(rng.sample(QUALIFICATIFS, 4))
+        yield Product(str(i), nom, description, Decimal('9.99'), 1, '1', '')
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn()
+    return result, (time.perf_counter() - start) / REPEAT
+
+
+def similarity(query, product):
+    query_words = [trigrams(word) for word in tokenize(query)]
+    return trigram_similarity(query_words, [trigrams(word) for word in tokenize(product.nom)])
+
+
+def top10_similarity(query, products):
+    return sum(sorted((similarity(query, product) for product in products), reverse=True)[:10])
+
+
+def main(nb_products):
+    products = list(generate_products(nb_products))
+    start = time.perf_counter()
+    index = CatalogIndex(None, products)
+    build = time.perf_counter() - start
+    print(f'{nb_products} produits, index construit en {build:.2f} s')
+
+    print(f'\n{"requête":<18}{"q in nom (ms)":>15}{"BM25 (ms)":>12}{"résultats":>12}')
+    for query in REQUETES:
+        _, legacy = timed(lambda: [p for p in products if query.lower() in p.nom.lower()])
+        (total, _), indexed = timed(lambda: index.search(query, 0, 10))
+        print(f'{query:<18}{legacy * 1e3:>15.2f}{indexed * 1e3:>12.2f}{total:>12}')
+
+    print(f'\n{"préfixe":<18}{"suggest (ms)":>15}')
+    for prefix in PREFIXES:
+        _, elapsed = timed(lambda: index.suggest(prefix))
+        print(f'{prefix:<18}{elapsed * 1e3:>15.3f}')
+
+    header = ''.join(f'{f"{n} cand. (ms)":>18}{"top 10":>8}' for n in MAX_CANDIDATES)
+    print(f'\n{"faute":<14}{"exhaustif (ms)":>16}{header}')
+    for query in FAUTES:
+        start = time.perf_counter()
+        expected = top10_similarity(query, products)
+        line = f'{query:<14}{(time.perf_counter() - start) * 1e3:>16.1f}'
+        for max_candidates in MAX_CANDIDATES:
+            (_, found), elapsed = timed(lambda: index.fuzzy_search(query, 0, 10, max_candidates=max_candidates))
+            quality = top10_similarity(query, found) / expected if expected else 1
+            line += f'{elapsed * 1e3:>18.2f}{quality:>8.0%}'
+        print(line)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,83 @@
+"""Benchmark : page admin des entreprises rendue d'un bloc vs en flux.
+
+Pour N entreprises, compare :
+- l'ancienne approche : liste complète des entreprises puis render_template ;
+- stream_page alimenté par iter_entreprises ;
+avec le temps avant le premier morceau, le temps total et le pic mémoire
+(tracemalloc) pendant le rendu.
+
+    python benchmarks/bench_streaming.py [nb_entreprises]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from flask import render_template  # noqa: E402
+
+import app as marketplace  # noqa: E402
+
+USER = {'id': '1', 'nom': 'Admin', 'role': 'admin'}
+
+
+def legacy():
+    entreprises = marketplace.get_all_entreprises()
+    all_stats = marketplace.get_all_entreprise_stats()
+    empty_stats = marketplace.format_stats(0, 0, 0)
+    for entreprise in entreprises:
+        entreprise.update(all_stats.get(str(entreprise['id']), empty_stats))
+    yield render_template('admin_entreprises.html', user=USER, entreprises=entreprises)
+
+
+def streamed():
+    all_stats = marketplace.get_all_entreprise_stats()
+    empty_stats = marketplace.format_stats(0, 0, 0)
+    entreprises = (
+        {**entreprise, **all_stats.get(str(entreprise['id']), empty_stats)}
+        for entreprise in marketplace.iter_entreprises()
+    )
+    return marketplace.stream_page('admin_entreprises.html', user=USER, entreprises=entreprises).response
+
+
+def measure(render):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = iter(render())
+    size = len(next(chunks))
+    first = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, peak, size
+
+
+def main(nb_entreprises):
+    tmp = tempfile.mkdtemp()
+    try:
+        shutil.copytree(os.path.join(ROOT, 'data'), os.path.join(tmp, 'data'))
+        os.chdir(tmp)
+        marketplace.init_csv_files()
+        for i in range(nb_entreprises):
+            marketplace.storage.create_entreprise(f'Entreprise {i}', '2025-01-01 00:00:00')
+        marketplace.get_all_entreprises()  # chargement du CSV hors mesure
+
+        print(f'{nb_entreprises} entreprises\n')
+        print(f'{"rendu":<10}{"1er morceau (ms)":>18}{"total (ms)":>12}{"pic mémoire (Ko)":>18}{"page (Ko)":>11}')
+        with marketplace.app.test_request_context('/admin/entreprises'):
+            for label, render in (('bloc', legacy), ('flux', streamed)):
+                first, total, peak, size = measure(render)
+                print(f'{label:<10}{first * 1e3:>18.1f}{total * 1e3:>12.1f}{peak / 1024:>18.0f}{size / 1024:>11.0f}')
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,65 @@
+"""Benchmark : rendu par requête, render_template_string vs registre compilé,
+puis page produits avec fiches rendues à chaque fois vs reprises du cache.
+
+    python benchmarks/bench_templates.py [iterations]
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import render_template, render_template_string  # noqa: E402
+
+import app as marketplace  # noqa: E402
+
+USER = {'id': '1', 'nom': 'Lundi', 'nom_entreprise': 'Lundi', 'id_entreprise': '1'}
+PRODUCTS = [
+    marketplace.Product(str(i), f'Produit {i}', 'Description', Decimal('9.99'), 10, '1', '')
+    for i in range(1, 11)
+]
+CONTEXTS = {
+    'auth.html': dict(login_error=None, register_error=None, success=None),
+    'dashboard.html': dict(user=USER, nb_products=10, total_quantity=100, total_value=99.9),
+    'product_list.html': dict(user=USER, products=PRODUCTS, page=1, total_pages=5, q='',
+                              page_links=[1, 2, 3, 4, 5], filters={}, sorts={},
+                              cards=marketplace.ProductCardCache().render(PRODUCTS)),
+    'product_card.html': dict(p=PRODUCTS[0]),
+    'product_form.html': dict(user=USER, product=PRODUCTS[0]),
+    'admin_entreprises.html': dict(user=USER, entreprises=[
+        {'id': '1', 'nom': 'Lundi', 'created_at': '2025-12-15 14:42:57', 'nb_products': 10,
+         'total_value': 99.9}
+    ]),
+}
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations):
+    print(f"{'template':<24} {'string':>10} {'compilé':>10} {'gain':>6}")
+    with marketplace.app.test_request_context('/'):
+        for name, context in CONTEXTS.items():
+            source = marketplace.TEMPLATES[name]
+            before = timed(lambda: render_template_string(source, **context), iterations)
+            after = timed(lambda: render_template(name, **context), iterations)
+            print(f'{name:<24} {before:>8.0f}us {after:>8.0f}us {before / after:>5.1f}x')
+
+        print(f"\n{'page produits':<24} {'rendu':>10} {'cache':>10} {'gain':>6}")
+        context = dict(CONTEXTS['product_list.html'])
+        cache = marketplace.ProductCardCache()
+
+        def page(cards):
+            return render_template('product_list.html', **dict(context, cards=cards.render(PRODUCTS)))
+        before = timed(lambda: page(marketplace.ProductCardCache()), iterations)
+        after = timed(lambda: page(cache), iterations)
+        print(f'{len(PRODUCTS)} fiches{"":<15} {before:>8.0f}us {after:>8.0f}us {before / after:>5.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
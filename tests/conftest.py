@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les tests importent `app` depuis la racine du dépôt, sans installation
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
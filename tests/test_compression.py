@@ -0,0 +1,45 @@
+import gzip
+
+from werkzeug.test import Client
+
+from app import CompressionMiddleware
+
+PAGE = b'<p>Produit</p>' * 200
+
+
+def get(wsgi_app):
+    middleware = CompressionMiddleware(wsgi_app, min_size=100)
+    return Client(middleware).get('/', headers={'Accept-Encoding': 'gzip'})
+
+
+def test_start_response_called_from_a_generator():
+    def lazy_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/html')])
+        yield PAGE[:1000]
+        yield PAGE[1000:]
+
+    response = get(lazy_app)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == PAGE
+
+
+def test_legacy_write_callable_is_compressed():
+    def write_app(environ, start_response):
+        write = start_response('200 OK', [('Content-Type', 'text/html'), ('Content-Length', str(len(PAGE)))])
+        write(PAGE[:1000])
+        return [PAGE[1000:]]
+
+    response = get(write_app)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == PAGE
+
+
+def test_legacy_write_callable_below_min_size_passes_through():
+    def write_app(environ, start_response):
+        write = start_response('200 OK', [('Content-Type', 'text/html')])
+        write(b'<p>court</p>')
+        return []
+
+    response = get(write_app)
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b'<p>court</p>'
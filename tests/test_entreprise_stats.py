@@ -0,0 +1,74 @@
+import sqlite3
+from decimal import Decimal
+
+from app import IdAllocator, ProductStore, SqliteBackend, format_stats
+
+
+def recomputed(products, id_entreprise):
+    products = [p for p in products if str(p.id_entreprise) == str(id_entreprise)]
+    return format_stats(len(products), sum(p.quantite for p in products),
+                        sum((p.prix * p.quantite for p in products), Decimal(0)))
+
+
+def product(nom, prix, quantite, id_entreprise='1'):
+    return {'nom': nom, 'description': '', 'prix': prix, 'quantite': quantite,
+            'id_entreprise': id_entreprise, 'image_url': ''}
+
+
+def changes(nom, prix, quantite):
+    return {'nom': nom, 'description': '', 'prix': prix, 'quantite': quantite, 'image_url': ''}
+
+
+def test_product_store_aggregates_follow_every_write(tmp_path):
+    store = ProductStore(str(tmp_path / 'products.csv'), str(tmp_path / 'products_log.csv'),
+                         IdAllocator(str(tmp_path / 'sequences.csv')))
+    first = store.add(product('Écran', '199.90', '3'))
+    second = store.add(product('Souris', '15', '10'))
+    store.add(product('Câble', '5', '4', id_entreprise='2'))
+    store.update(first, '1', changes('Écran', '189.90', '2'))
+    store.update(second, '1', {'id_entreprise': '2'})
+    store.delete(first, '1')
+    for id_entreprise in ('1', '2', '3'):
+        assert store.stats(id_entreprise) == recomputed(store.all(), id_entreprise)
+    assert store.all_stats()['2'] == format_stats(2, 14, Decimal('170'))
+
+
+def test_sqlite_triggers_keep_aggregates_in_sync(tmp_path):
+    backend = SqliteBackend(str(tmp_path / 'app.db'))
+    backend.init()
+    first = backend.add_product(product('Écran', '199.90', 3))
+    backend.add_product(product('Souris', '15', 10))
+    backend.add_product(product('Câble', '5', 4, id_entreprise=2))
+    backend.update_product(first, 1, changes('Écran', '189.90', 2))
+    assert backend.get_entreprise_stats(1) == recomputed(backend.get_all_products(), 1)
+    backend.delete_product(first, 1)
+    for id_entreprise in (1, 2, 3):
+        assert backend.get_entreprise_stats(id_entreprise) == recomputed(backend.get_all_products(), id_entreprise)
+
+    # rebuild_stats retombe sur les mêmes agrégats
+    expected = backend.get_all_entreprise_stats()
+    backend.rebuild_stats()
+    assert backend.get_all_entreprise_stats() == expected
+
+
+def test_init_migrates_real_total_value_to_cents(tmp_path):
+    path = str(tmp_path / 'app.db')
+    with sqlite3.connect(path) as conn:
+        conn.executescript('''
+            CREATE TABLE products (id INTEGER PRIMARY KEY, nom TEXT NOT NULL, description TEXT NOT NULL DEFAULT '',
+                prix NUMERIC NOT NULL, quantite INTEGER NOT NULL, id_entreprise INTEGER NOT NULL,
+                image_url TEXT NOT NULL DEFAULT '');
+            CREATE TABLE entreprise_stats (id_entreprise INTEGER PRIMARY KEY,
+                nb_products INTEGER NOT NULL DEFAULT 0, total_quantity INTEGER NOT NULL DEFAULT 0,
+                total_value REAL NOT NULL DEFAULT 0, version INTEGER NOT NULL DEFAULT 0);
+            CREATE TRIGGER products_stats_insert AFTER INSERT ON products BEGIN
+                INSERT OR IGNORE INTO entreprise_stats (id_entreprise) VALUES (NEW.id_entreprise);
+                UPDATE entreprise_stats SET total_value = total_value + NEW.prix * NEW.quantite
+                WHERE id_entreprise = NEW.id_entreprise;
+            END;
+            INSERT INTO products (nom, prix, quantite, id_entreprise) VALUES ('Écran', '199.90', 3, 1);
+        ''')
+    backend = SqliteBackend(path)
+    backend.init()
+    backend.add_product(product('Souris', '0.10', 3))
+    assert backend.get_entreprise_stats(1) == format_stats(2, 6, Decimal('600.00'))
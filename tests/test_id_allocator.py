@@ -0,0 +1,30 @@
+import csv
+
+from app import IdAllocator
+
+
+def test_blocks_never_overlap_between_workers(tmp_path):
+    path = str(tmp_path / 'sequences.csv')
+    seeds = []
+    a, b = IdAllocator(path, block_size=10), IdAllocator(path, block_size=10)
+
+    def seed():
+        seeds.append(1)
+        return 5
+
+    ids = [a.next_id('products', seed) for _ in range(3)]
+    ids += [b.next_id('products', seed) for _ in range(12)]
+    ids += [a.next_id('products', seed) for _ in range(8)]
+    assert len(set(ids)) == len(ids)
+    assert ids[:3] == [5, 6, 7]
+    assert ids[3] == 15
+    # La graine n'est lue qu'à la création de la séquence
+    assert seeds == [1]
+
+
+def test_restart_skips_the_unused_part_of_a_block(tmp_path):
+    path = str(tmp_path / 'sequences.csv')
+    IdAllocator(path, block_size=10).next_id('users', lambda: 1)
+    assert IdAllocator(path, block_size=10).next_id('users', lambda: 1) == 11
+    with open(path, encoding='utf-8') as f:
+        assert {row['table']: row['next_id'] for row in csv.DictReader(f)} == {'users': '21'}
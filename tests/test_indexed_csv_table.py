@@ -0,0 +1,40 @@
+import os
+import threading
+
+from app import USER_FIELDS, IndexedCsvTable
+
+
+def make_table(path):
+    return IndexedCsvTable(str(path), USER_FIELDS, {'id': lambda row: row['id']})
+
+
+def user(user_id):
+    return {'id': user_id, 'nom': f'Utilisateur {user_id}', 'email': f'{user_id}@example.com',
+            'mdp': 'hash', 'role': 'user', 'created_at': '2025-01-01 00:00:00', 'id_entreprise': '1'}
+
+
+def test_update_keeps_concurrent_appends(tmp_path):
+    path = tmp_path / 'users.csv'
+    path.write_text(','.join(USER_FIELDS) + '\n', encoding='utf-8')
+    # Deux instances = deux workers : seul le flock sur le fichier les coordonne
+    registrations, logins = make_table(path), make_table(path)
+    registrations.append(user('0'))
+
+    def register():
+        for i in range(1, 200):
+            registrations.append(user(str(i)))
+
+    def rehash():
+        for i in range(200):
+            logins.update('id', '0', {'mdp': f'rehash {i}'})
+
+    threads = [threading.Thread(target=register), threading.Thread(target=rehash)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reloaded = make_table(path)
+    assert len(reloaded.all()) == 200
+    assert reloaded.get('id', '0')['mdp'] == 'rehash 199'
+    assert [f for f in os.listdir(tmp_path) if f.endswith('.tmp')] == []
@@ -0,0 +1,17 @@
+import app
+from app import LoginThrottle
+
+
+def test_rejected_login_looks_up_the_account_outside_the_counters_lock(monkeypatch):
+    monkeypatch.setattr(app, 'login_ip_throttle', LoginThrottle(0, 1))
+    monkeypatch.setattr(app, 'login_throttle_counters', dict.fromkeys(app.login_throttle_counters, 0))
+
+    def get_user_by_email(email):
+        assert not app._login_counters_lock.locked()
+        return {'email': email}
+
+    monkeypatch.setattr(app, 'get_user_by_email', get_user_by_email)
+    assert app.login_retry_after('10.0.0.1', 'alice@example.com') > 0
+    assert app.login_throttle_counters['rejected_ip'] == 1
+    assert app.login_throttle_counters['bcrypt_avoided'] == 1
+
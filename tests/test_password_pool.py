@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from app import PasswordHasherPool, PasswordPoolBusy, _bcrypt_check, _bcrypt_hash
+
+
+def test_pool_recovers_from_dead_worker():
+    pool = PasswordHasherPool(workers=1, max_pending=4)
+    hashed = pool.run(_bcrypt_hash, 'secret', 4)
+
+    # Le worker meurt à chaque tentative : 503 plutôt qu'une exception brute
+    with pytest.raises(PasswordPoolBusy):
+        pool.run(os._exit, 1)
+
+    assert pool.run(_bcrypt_check, 'secret', hashed) is True
+    metrics = pool.metrics()
+    assert metrics['restarts'] == 2
+    assert metrics['queue_depth'] == 0
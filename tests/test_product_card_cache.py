@@ -0,0 +1,36 @@
+from app import IdAllocator, ProductCardCache, ProductStore, SqliteBackend, app
+
+
+def make_store(tmp_path):
+    return ProductStore(str(tmp_path / 'products.csv'), str(tmp_path / 'products_log.csv'),
+                        IdAllocator(str(tmp_path / 'sequences.csv')))
+
+
+def product(prix):
+    return {'nom': 'Écran', 'description': '', 'prix': prix, 'quantite': '2',
+            'id_entreprise': '1', 'image_url': ''}
+
+
+def test_price_formatting_change_invalidates_card(tmp_path):
+    store = make_store(tmp_path)
+    cache = ProductCardCache()
+    product_id = store.add(product('1'))
+    with app.test_request_context('/products'):
+        assert '1 €' in cache.render(store.by_entreprise('1'))
+        assert '1 €' in cache.render(store.by_entreprise('1'))
+        # Égal en Decimal, mais pas le même prix affiché : nouvelle révision
+        store.update(product_id, '1', {'prix': '1.00'})
+        assert '1.00 €' in cache.render(store.by_entreprise('1'))
+    assert cache.metrics() == {'size': 1, 'hits': 1, 'misses': 2}
+
+
+def test_sqlite_revision_changes_on_update(tmp_path):
+    backend = SqliteBackend(str(tmp_path / 'app.db'))
+    cache = ProductCardCache()
+    product_id = backend.add_product(product('1'))
+    with app.test_request_context('/products'):
+        cache.render(backend.get_products_by_entreprise(1))
+        cache.render(backend.get_products_by_entreprise(1))
+        backend.update_product(product_id, 1, product('1.00'))
+        assert '1.00 €' in cache.render(backend.get_products_by_entreprise(1))
+    assert cache.metrics() == {'size': 1, 'hits': 1, 'misses': 2}
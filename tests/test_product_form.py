@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+import pytest
+
+import app as app_module
+from app import CatalogIndexes, Product, SqliteBackend, app, parse_price, update_product
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('12', Decimal('12.00')),
+    (' 1.5 ', Decimal('1.50')),
+    ('.5', Decimal('0.50')),
+    ('0.005', Decimal('0.01')),
+])
+def test_parse_price_rounds_to_the_cent(value, expected):
+    assert str(parse_price(value)) == str(expected)
+
+
+@pytest.mark.parametrize('value', ['-1', '1E+2', '1e3', 'NaN', 'Infinity', '', '1,5', '9' * 40])
+def test_parse_price_rejects(value):
+    with pytest.raises(ValueError):
+        parse_price(value)
+
+
+def test_stored_prices_are_read_as_is():
+    row = {'id': '1', 'nom': 'Écran', 'description': '', 'prix': '-1E+2', 'quantite': 'x',
+           'id_entreprise': '1', 'image_url': ''}
+    product = Product.from_row(row)
+    assert (product.prix, product.quantite) == (Decimal('-100'), 0)
+
+
+def test_invalid_product_is_shown_again_with_an_error():
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(user_id=1, user_nom='Alice', id_entreprise=1, nom_entreprise='Acme')
+    response = client.post('/products/add', data={'nom': 'Écran', 'description': 'HD', 'prix': '-3',
+                                                  'quantite': '2', 'image_url': ''})
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert "Prix invalide : &#39;-3&#39;" in html
+    assert 'value="Écran"' in html and '>HD</textarea>' in html
+
+
+def test_unchanged_legacy_image_is_kept_on_edit(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'storage', SqliteBackend(str(tmp_path / 'app.db')))
+    monkeypatch.setattr(app_module, 'catalog_indexes', CatalogIndexes())
+    product_id = app_module.storage.add_product({'nom': 'Écran', 'description': '', 'prix': '10', 'quantite': 1,
+                                                 'id_entreprise': 1, 'image_url': '//cdn.example.com/a.png'})
+    assert update_product(product_id, 1, 'Écran 24"', '', '12', '1', '//cdn.example.com/a.png')
+    assert app_module.storage.get_product_by_id(product_id, 1).nom == 'Écran 24"'
+    with pytest.raises(ValueError):
+        update_product(product_id, 1, 'Écran', '', '12', '1', '//cdn.example.com/b.png')
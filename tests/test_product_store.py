@@ -0,0 +1,178 @@
+import os
+import threading
+
+import app
+from app import IdAllocator, ProductStore
+
+
+def make_store(tmp_path, **kwargs):
+    return ProductStore(str(tmp_path / 'products.csv'), str(tmp_path / 'products_log.csv'),
+                        IdAllocator(str(tmp_path / 'sequences.csv')), **kwargs)
+
+
+def product(nom, prix='9.99', quantite='1', id_entreprise='1'):
+    return {'nom': nom, 'description': '', 'prix': prix, 'quantite': quantite,
+            'id_entreprise': id_entreprise, 'image_url': ''}
+
+
+def rows(products):
+    # Les révisions sont propres à chaque ProductStore : seules les données comptent
+    return sorted(tuple(p.as_row().values()) for p in products)
+
+
+def snapshot(store, entreprises=('1', '2')):
+    return {
+        'products': rows(store.all()),
+        'stats': {e: store.stats(e) for e in entreprises},
+        'versions': {e: store.version(e) for e in entreprises},
+    }
+
+
+def test_versions_match_after_reload(tmp_path):
+    store = make_store(tmp_path)
+    first = store.add(product('Écran'))
+    store.update(first, '1', {'prix': '12'})
+    store.add(product('Souris', id_entreprise='2'))
+    second = store.add(product('Clavier'))
+    store.delete(second, '1')
+    live = snapshot(store)
+
+    reloaded = make_store(tmp_path)
+    assert snapshot(reloaded) == live
+    assert live['versions']['1'][1] == 4
+
+    # L'écriture suivante ne peut pas réutiliser une version déjà vue par un autre processus
+    store.add(product('Câble'))
+    assert store.version('1') != live['versions']['1']
+    assert snapshot(make_store(tmp_path)) == snapshot(store)
+
+
+def test_compaction_round_trip(tmp_path):
+    store = make_store(tmp_path)
+    ids = [store.add(product(f'Produit {i}', quantite=str(i))) for i in range(5)]
+    store.update(ids[0], '1', {'id_entreprise': '2'})
+    store.delete(ids[1], '1')
+    products = rows(store.all())
+
+    store.compact()
+    assert not os.path.exists(store.log_path)
+    assert rows(store.all()) == products
+    assert snapshot(make_store(tmp_path)) == snapshot(store)
+
+    store.add(product('Après compactage'))
+    assert snapshot(make_store(tmp_path)) == snapshot(store)
+
+
+def test_abandoned_compaction_is_replayed(tmp_path):
+    store = make_store(tmp_path)
+    store.add(product('Écran'))
+    os.replace(store.log_path, store.compacting_path)
+    store.add(product('Souris'))
+    products = rows(make_store(tmp_path).all())
+    assert [nom for _, nom, *_ in products] == ['Écran', 'Souris']
+
+    store.compact()
+    assert not os.path.exists(store.compacting_path)
+    assert rows(make_store(tmp_path).all()) == products
+
+
+def test_concurrent_workers_lose_nothing(tmp_path):
+    # Deux instances = deux workers : seul le flock sur les fichiers les coordonne
+    workers = [make_store(tmp_path, log_max_bytes=2048) for _ in range(2)]
+
+    def write(store, name):
+        for i in range(100):
+            store.add(product(f'{name} {i}'))
+
+    threads = [threading.Thread(target=write, args=(store, f'Worker {n}')) for n, store in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for compaction in [store._compaction for store in workers]:
+        if compaction is not None:
+            compaction.join()
+
+    reloaded = make_store(tmp_path)
+    assert len(reloaded.all()) == 200
+    assert [f for f in os.listdir(tmp_path) if f.endswith('.tmp')] == []
+    for store in workers:
+        assert snapshot(store) == snapshot(reloaded)
+
+
+def test_workers_agree_on_versions(tmp_path):
+    # La version sert d'ETag (page_etag) : une même version ne doit jamais désigner deux états
+    a, b = make_store(tmp_path), make_store(tmp_path)
+    seen = {}
+
+    def check():
+        assert a.version('1') == b.version('1')
+        for store in (a, b):
+            assert seen.setdefault(store.version('1'), rows(store.by_entreprise('1'))) == rows(store.by_entreprise('1'))
+
+    check()
+    first = a.add(product('Écran'))
+    check()
+    b.update(first, '1', {'prix': '12'})
+    check()
+    a.add(product('Souris', id_entreprise='2'))
+    check()
+    b.compact()
+    check()
+    a.update(first, '1', {'prix': '13'})
+    check()
+    b.delete(first, '1')
+    a.compact()
+    check()
+    assert len(seen) >= 5
+
+
+def test_reads_and_writes_continue_during_compaction(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    first = store.add(product('Écran'))
+    store.add(product('Souris', id_entreprise='2'))
+    writing, release = threading.Event(), threading.Event()
+    write_all_products = app.write_all_products
+
+    def slow_write(products, path):
+        writing.set()
+        assert release.wait(5)
+        write_all_products(products, path)
+
+    monkeypatch.setattr(app, 'write_all_products', slow_write)
+    compaction = threading.Thread(target=store.compact)
+    compaction.start()
+    assert writing.wait(5)
+
+    # Le snapshot est en cours d'écriture : aucun verrou ne doit être tenu
+    other = make_store(tmp_path)
+    assert rows(other.all()) == rows(store.all())
+    assert store.get(first, '1').nom == 'Écran'
+    store.update(first, '1', {'prix': '12'})
+    store.add(product('Clavier'))
+    assert snapshot(other) == snapshot(store)
+
+    release.set()
+    compaction.join()
+    assert os.path.exists(store.log_path) and not os.path.exists(store.compacting_path)
+    assert snapshot(make_store(tmp_path)) == snapshot(store)
+    assert snapshot(other) == snapshot(store)
+
+
+def test_compaction_is_skipped_while_another_worker_compacts(tmp_path):
+    store = make_store(tmp_path)
+    store.add(product('Écran'))
+    with make_store(tmp_path)._compactor.hold():
+        store.compact()
+        assert os.path.exists(store.log_path)
+    store.compact()
+    assert not os.path.exists(store.log_path)
+
+
+def test_abandoned_compaction_resets_versions(tmp_path):
+    store = make_store(tmp_path)
+    store.add(product('Écran'))
+    os.replace(store.log_path, store.compacting_path)
+    store.add(product('Souris'))
+    store.compact()
+    assert snapshot(make_store(tmp_path)) == snapshot(store)
@@ -0,0 +1,34 @@
+import hashlib
+import os
+
+from app import PwnedPasswordFilter, build_pwned_filter
+
+
+def build(tmp_path, *passwords):
+    dump = tmp_path / 'dump.txt'
+    dump.write_text(''.join(f'{hashlib.sha1(p.encode()).hexdigest().upper()}:1\n' for p in passwords))
+    path = str(tmp_path / 'pwned.bloom')
+    build_pwned_filter(str(dump), path)
+    return path
+
+
+def test_rebuild_and_removal(tmp_path):
+    path = build(tmp_path, 'hunter2')
+    pwned = PwnedPasswordFilter(path)
+    assert 'hunter2' in pwned
+    first = pwned._bits
+
+    build(tmp_path, 'azerty')
+    assert 'azerty' in pwned
+    assert first.closed
+
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    os.remove(path)
+    assert 'azerty' not in pwned
+    # Même fichier remis en place (même mtime et taille) : le filtre doit être relu
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert 'azerty' in pwned
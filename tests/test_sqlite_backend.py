@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+from app import SqliteBackend
+
+OLD_SCHEMA = '''
+CREATE TABLE entreprises (id INTEGER PRIMARY KEY, nom TEXT NOT NULL, created_at TEXT NOT NULL);
+CREATE INDEX idx_entreprises_nom ON entreprises (lower(nom));
+INSERT INTO entreprises (nom, created_at) VALUES ('Éclair Straße', '2025-01-01 00:00:00');
+'''
+
+
+def test_get_entreprise_by_nom_is_unicode_case_insensitive(tmp_path):
+    backend = SqliteBackend(str(tmp_path / 'app.db'))
+    backend.init()
+    entreprise_id = backend.create_entreprise('Œuvre Été', '2025-01-01 00:00:00')
+    assert backend.get_entreprise_by_nom('œuvre été')['id'] == entreprise_id
+    assert backend.get_entreprise_by_nom('ŒUVRE ÉTÉ') == backend.get_entreprise_by_id(entreprise_id)
+    assert backend.get_entreprise_by_nom('Oeuvre Ete') is None
+
+
+def test_init_migrates_existing_entreprises(tmp_path):
+    path = str(tmp_path / 'app.db')
+    with sqlite3.connect(path) as conn:
+        conn.executescript(OLD_SCHEMA)
+    backend = SqliteBackend(path)
+    backend.init()
+    assert backend.get_entreprise_by_nom('ÉCLAIR STRASSE')['nom'] == 'Éclair Straße'
+    assert list(backend.get_all_entreprises()[0]) == ['id', 'nom', 'created_at']
+
+
+def test_connections_of_other_threads_skip_schema_setup(tmp_path, monkeypatch):
+    backend = SqliteBackend(str(tmp_path / 'app.db'))
+    backend.init()
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(sqlite3, 'connect', traced_connect)
+    thread = threading.Thread(target=backend.get_entreprise_by_nom, args=('Absente',))
+    thread.start()
+    thread.join()
+    assert [sql for sql in statements if 'CREATE' in sql or 'table_info' in sql] == []
+    assert any('nom_key' in sql for sql in statements)
+
+
+def test_first_connection_creates_the_schema_without_init(tmp_path):
+    # flask run / gunicorn n'appellent pas init_app()
+    backend = SqliteBackend(str(tmp_path / 'data' / 'app.db'))
+    assert backend.get_entreprise_by_nom('Absente') is None
+    assert backend.get_entreprise_stats(1)['nb_products'] == 0
+
+
+def test_prices_keep_their_text_form(tmp_path):
+    backend = SqliteBackend(str(tmp_path / 'app.db'))
+    product_id = backend.add_product({'nom': 'Écran', 'description': '', 'prix': '1.10', 'quantite': 3,
+                                      'id_entreprise': 1, 'image_url': ''})
+    assert str(backend.get_product_by_id(product_id, 1).prix) == '1.10'
+
+
+def test_init_migrates_numeric_prices_to_text(tmp_path):
+    path = str(tmp_path / 'app.db')
+    with sqlite3.connect(path) as conn:
+        conn.executescript(OLD_SCHEMA + '''
+            CREATE TABLE products (id INTEGER PRIMARY KEY, nom TEXT NOT NULL, description TEXT NOT NULL DEFAULT '',
+                prix NUMERIC NOT NULL, quantite INTEGER NOT NULL, id_entreprise INTEGER NOT NULL,
+                image_url TEXT NOT NULL DEFAULT '');
+            INSERT INTO products (nom, prix, quantite, id_entreprise) VALUES ('Écran', '1.10', 3, 1);
+        ''')
+    backend = SqliteBackend(path)
+    assert [str(p.prix) for p in backend.get_all_products()] == ['1.10']
+    backend.add_product({'nom': 'Souris', 'description': '', 'prix': '2.50', 'quantite': 2,
+                         'id_entreprise': 1, 'image_url': ''})
+    assert [str(p.prix) for p in backend.get_all_products()] == ['1.10', '2.50']
+    stats = backend.get_entreprise_stats(1)
+    assert (stats['nb_products'], stats['total_value']) == (2, 8.3)